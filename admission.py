@@ -0,0 +1,169 @@
+"""
+Adaptive load shedding for the analysis routes.
+Tracks in-flight analyses and an EWMA of recent analysis latency per
+worker process, kept separately per route class: a screenshot upload pays
+for OCR and is judged against its own SLO, so a burst of them neither
+degrades text analyses nor hides behind their fast average. Under
+pressure requests are admitted in degraded mode (optional stages skipped,
+core scores still computed); when the worker is saturated they are
+rejected with 503 + Retry-After so queues never build up past the
+gunicorn timeout.
+
+NDJSON streams live for minutes, so they take a stream slot instead of an
+in-flight one (otherwise a few open streams would keep every request
+degraded); their per-line latencies feed the text EWMA.
+
+Limits come from the environment:
+    FRAUDSHIELD_MAX_IN_FLIGHT      reject at or above this many (default 32)
+    FRAUDSHIELD_DEGRADE_IN_FLIGHT  degrade at or above this many (default 8)
+    FRAUDSHIELD_LATENCY_SLO_MS     degrade while text EWMA latency exceeds it (default 400)
+    FRAUDSHIELD_OCR_SLO_MS         same for screenshot uploads (default 4000)
+    FRAUDSHIELD_MAX_STREAMS        concurrent NDJSON streams (default 4)
+"""
+import os
+import time
+import threading
+from functools import wraps
+
+from flask import g, jsonify, request, Response
+
+FULL     = "full"
+DEGRADED = "degraded"
+
+TEXT  = "text"
+IMAGE = "image"
+
+
+def route_class():
+    """TEXT or IMAGE (a multipart request carrying an uploaded file)."""
+    if request.mimetype == "multipart/form-data" and any(
+            f.filename for f in request.files.values()):
+        return IMAGE
+    return TEXT
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=32, degrade_in_flight=8, latency_slo_ms=400.0,
+                 ewma_alpha=0.2, retry_after=2, ocr_slo_ms=4000.0, max_streams=4):
+        self.max_in_flight = max_in_flight
+        self.degrade_in_flight = degrade_in_flight
+        self.slo_ms = {TEXT: latency_slo_ms, IMAGE: ocr_slo_ms}
+        self.ewma_alpha = ewma_alpha
+        self.retry_after = retry_after
+        self.max_streams = max_streams
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.streams = 0
+        self.ewma_ms = {TEXT: 0.0, IMAGE: 0.0}
+        self.counts = {FULL: 0, DEGRADED: 0, "rejected": 0, "streams_rejected": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_in_flight=int(os.environ.get("FRAUDSHIELD_MAX_IN_FLIGHT", 32)),
+            degrade_in_flight=int(os.environ.get("FRAUDSHIELD_DEGRADE_IN_FLIGHT", 8)),
+            latency_slo_ms=float(os.environ.get("FRAUDSHIELD_LATENCY_SLO_MS", 400)),
+            ocr_slo_ms=float(os.environ.get("FRAUDSHIELD_OCR_SLO_MS", 4000)),
+            max_streams=int(os.environ.get("FRAUDSHIELD_MAX_STREAMS", 4)),
+        )
+
+    def _mode(self, kind):
+        if self.in_flight >= self.degrade_in_flight or self.ewma_ms[kind] > self.slo_ms[kind]:
+            return DEGRADED
+        return FULL
+
+    def admit(self, kind=TEXT):
+        """Return FULL, DEGRADED, or None (reject). Admitted calls must release()."""
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.counts["rejected"] += 1
+                return None
+            self.in_flight += 1
+            mode = self._mode(kind)
+            self.counts[mode] += 1
+            return mode
+
+    def release(self, elapsed_ms=None, mode=FULL, kind=TEXT):
+        """Free the slot; elapsed_ms=None when latency was reported via observe()."""
+        with self._lock:
+            self.in_flight -= 1
+        if elapsed_ms is not None:
+            self.observe(elapsed_ms, mode, kind)
+
+    def admit_stream(self):
+        """Like admit() for an NDJSON stream, on the stream slots. Pair with release_stream()."""
+        with self._lock:
+            if self.streams >= self.max_streams:
+                self.counts["streams_rejected"] += 1
+                return None
+            self.streams += 1
+            return self._mode(TEXT)
+
+    def release_stream(self):
+        with self._lock:
+            self.streams -= 1
+
+    def observe(self, elapsed_ms, mode=FULL, kind=TEXT):
+        """Feed one analysis latency sample into its route class's EWMA."""
+        with self._lock:
+            # Degraded requests are cheaper by design; feeding them back at
+            # face value would flap between modes, so they only pull the
+            # average down when they are already under the SLO.
+            if mode == FULL or elapsed_ms < self.slo_ms[kind]:
+                self.ewma_ms[kind] += self.ewma_alpha * (elapsed_ms - self.ewma_ms[kind])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "ewma_latency_ms": {kind: round(v, 1) for kind, v in self.ewma_ms.items()},
+                "latency_slo_ms": dict(self.slo_ms),
+                "max_in_flight": self.max_in_flight,
+                "degrade_in_flight": self.degrade_in_flight,
+                "streams": self.streams,
+                "max_streams": self.max_streams,
+                "admitted_full": self.counts[FULL],
+                "admitted_degraded": self.counts[DEGRADED],
+                "rejected": self.counts["rejected"],
+                "streams_rejected": self.counts["streams_rejected"],
+            }
+
+
+def shed_response(controller):
+    """503 with Retry-After; JSON for API clients, plain text otherwise."""
+    if request.path.startswith("/api/"):
+        resp = jsonify({"error": "Service saturated, retry shortly.",
+                        "retry_after": controller.retry_after})
+        resp.status_code = 503
+    else:
+        resp = Response("FraudShield is under heavy load. Please retry in a few seconds.",
+                        status=503, mimetype="text/plain")
+    resp.headers["Retry-After"] = str(controller.retry_after)
+    return resp
+
+
+def admission_controlled(controller, methods=("POST",)):
+    """
+    Route decorator: admit/degrade/reject requests with the given methods
+    and expose the decision to the view as flask.g.degraded. Latency is
+    recorded under the request's route_class().
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in methods:
+                g.degraded = False
+                return view(*args, **kwargs)
+            kind = route_class()
+            mode = controller.admit(kind)
+            if mode is None:
+                return shed_response(controller)
+            g.degraded = mode == DEGRADED
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release((time.perf_counter() - start) * 1000, mode, kind)
+        return wrapper
+    return decorator
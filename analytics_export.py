@@ -0,0 +1,234 @@
+"""
+Columnar analytics export of analysis_logs.
+Streams the log table in id-ordered chunks into Parquet (or Arrow IPC
+stream) with typed columns: flags as a list of dictionary-encoded strings,
+risk_level dictionary-encoded, analyzed_at as a real timestamp.
+
+Exports are incremental: each run covers ids above the last watermark up
+to a snapshot of MAX(id) taken at the start, and memory stays bounded by
+the chunk size however large the table is.
+
+    python analytics_export.py --out exports/            # parquet, incremental
+    python analytics_export.py --out exports/ --format arrow --since-id 0
+
+The same stream is served to admins at /api/export/logs?since_id=N
+(X-Admin-Token header required).
+"""
+import os
+import json
+import sqlite3
+import argparse
+
+from database import DB_PATH
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional dependency, only needed for exports
+    pa = None
+
+CHUNK_SIZE = 50_000
+WATERMARK_FILE = "_watermark.json"
+RISK_LEVELS = ["LOW", "MEDIUM", "HIGH"]
+COLUMNS = ["id", "message", "rule_score", "ai_score", "final_score",
+           "risk_level", "flags", "analyzed_at", "campaign_id", "rule_pack_version"]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed. Install it with: pip install pyarrow")
+
+
+def export_schema():
+    _require_pyarrow()
+    return pa.schema([
+        ("id",          pa.int64()),
+        ("message",     pa.string()),
+        ("rule_score",  pa.int16()),
+        ("ai_score",    pa.int16()),
+        ("final_score", pa.int16()),
+        ("risk_level",  pa.dictionary(pa.int8(), pa.string())),
+        ("flags",       pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+        ("analyzed_at", pa.timestamp("s")),
+        ("campaign_id", pa.int64()),
+        ("rule_pack_version", pa.dictionary(pa.int16(), pa.string())),
+    ])
+
+
+def _connect_readonly():
+    return sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+
+
+def snapshot_max_id():
+    conn = _connect_readonly()
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM analysis_logs").fetchone()[0]
+    conn.close()
+    return max_id
+
+
+def _to_batch(rows, schema):
+    cols = list(zip(*rows))
+
+    risk_index = {level: i for i, level in enumerate(RISK_LEVELS)}
+    risk = pa.DictionaryArray.from_arrays(
+        pa.array([risk_index.get(r, None) for r in cols[5]], pa.int8()),
+        pa.array(RISK_LEVELS, pa.string()),
+    )
+
+    offsets, flat = [0], []
+    for flags in cols[6]:
+        if flags:
+            flat.extend(f.strip() for f in flags.split(", ") if f.strip())
+        offsets.append(len(flat))
+    flags = pa.ListArray.from_arrays(
+        pa.array(offsets, pa.int32()),
+        pa.array(flat, pa.string()).dictionary_encode(),
+    )
+
+    analyzed_at = pc.strptime(pa.array(cols[7], pa.string()),
+                              format="%Y-%m-%d %H:%M:%S", unit="s")
+
+    return pa.record_batch([
+        pa.array(cols[0], pa.int64()),
+        pa.array(cols[1], pa.string()),
+        pa.array(cols[2], pa.int16()),
+        pa.array(cols[3], pa.int16()),
+        pa.array(cols[4], pa.int16()),
+        risk,
+        flags,
+        analyzed_at,
+        pa.array(cols[8], pa.int64()),
+        pa.array(cols[9], pa.string()).dictionary_encode().cast(schema.field("rule_pack_version").type),
+    ], schema=schema)
+
+
+def iter_batches(since_id=0, until_id=None, chunk_size=CHUNK_SIZE):
+    """Yield Arrow record batches for since_id < id <= until_id, in id order."""
+    _require_pyarrow()
+    schema = export_schema()
+    if until_id is None:
+        until_id = snapshot_max_id()
+    conn = _connect_readonly()
+    try:
+        last_id = since_id
+        while last_id < until_id:
+            rows = conn.execute(f"""
+                SELECT {", ".join(COLUMNS)} FROM analysis_logs
+                WHERE id > ? AND id <= ?
+                ORDER BY id LIMIT ?
+            """, (last_id, until_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            yield _to_batch(rows, schema)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_arrow_stream(since_id=0, until_id=None, chunk_size=CHUNK_SIZE):
+    """Yield an Arrow IPC stream as byte chunks, one per record batch."""
+    _require_pyarrow()
+    import pyarrow.ipc as ipc
+    sink = _ChunkSink()
+    writer = ipc.new_stream(sink, export_schema())
+    yield sink.take()
+    for batch in iter_batches(since_id, until_id, chunk_size):
+        writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def read_watermark(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f).get("last_id", 0)
+
+
+def write_watermark(out_dir, last_id):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"last_id": last_id}, f)
+    os.replace(tmp, path)
+
+
+def export_logs(out_dir, fmt="parquet", since_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Export new rows to one file in out_dir and advance the watermark.
+    Returns (path or None, rows_written, new_watermark).
+    """
+    _require_pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    if since_id is None:
+        since_id = read_watermark(out_dir)
+    until_id = snapshot_max_id()
+    if until_id <= since_id:
+        return None, 0, since_id
+
+    ext = "parquet" if fmt == "parquet" else "arrows"
+    path = os.path.join(out_dir, f"analysis_logs_{since_id + 1:012d}_{until_id:012d}.{ext}")
+    tmp = path + ".tmp"
+    schema = export_schema()
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(tmp, schema, compression="zstd")
+    else:
+        import pyarrow.ipc as ipc
+        writer = ipc.new_stream(tmp, schema)
+
+    rows = 0
+    try:
+        for batch in iter_batches(since_id, until_id, chunk_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+
+    os.replace(tmp, path)
+    write_watermark(out_dir, until_id)
+    return path, rows, until_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export analysis_logs to a columnar format.")
+    parser.add_argument("--out", default="exports", help="output directory (holds the watermark)")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--since-id", type=int, default=None,
+                        help="export ids above this one (default: stored watermark)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    path, rows, watermark = export_logs(args.out, args.format, args.since_id, args.chunk_size)
+    if path is None:
+        print(f"Nothing new to export (watermark {watermark}).")
+    else:
+        print(f"Wrote {rows} rows to {path} (watermark {watermark}).")
+
+
+if __name__ == "__main__":
+    main()
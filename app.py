@@ -1,27 +1,80 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, Response, g, stream_with_context
 import io
-
-from rule_engine     import analyze_message, highlight_message
-from nlp_model       import get_ai_score, _pipeline
-from database        import init_db, log_analysis, get_recent_logs, get_stats
-from ocr_scanner     import extract_text_from_image
-from pdf_report      import generate_pdf_report
-from url_inspector   import inspect_urls_in_message
-from multilingual    import analyze_multilingual
-from explainability  import get_ai_explanation
+import os
+import time
+import threading
+from concurrent.futures import TimeoutError as RenderTimeout
+import hmac
+import html
+from functools import wraps
+
+from markupsafe import Markup
+
+from rule_engine     import highlight_spans
+from nlp_model       import model_fingerprint
+from database        import (init_db, log_analysis, get_recent_logs, get_stats, search_logs,
+                             get_active_campaigns, get_stats_timeseries, get_data_version,
+                             get_result, iter_messages_since, get_last_log_id, DB_PATH)
+from rollups         import parse_duration
+from scoring         import get_risk_level, score_core, finish_verdict, Cascade
+from subsystems      import extract_text_from_image, generate_pdf_report, get_ai_explanation, explain_batcher
 from community_feed  import get_community_feed, get_top_flags
+from long_input      import analyze_long_input, cap_text, LONG_INPUT_THRESHOLD
+from admission       import AdmissionController, admission_controlled, shed_response
+from ndjson_stream   import stream_results
+from assets          import register_assets
+from report_cache    import ReportCache
+from trending        import TrendingIndicators, extract_indicators, WINDOWS as TREND_WINDOWS, KINDS as TREND_KINDS
+from profiling       import RequestProfiler, profiled, FORMATS as PROFILE_FORMATS
+from http_cache      import conditional_get, build_fingerprint, SHARED_SHORT, REVALIDATE
+from fragment_cache  import FragmentCache
+import rule_packs
+import log_shards
 
 app = Flask(__name__)
+asset_manifest = register_assets(app)
 init_db()
+admission = AdmissionController.from_env()
+report_cache = ReportCache.from_env(generate_pdf_report, lambda log_id: load_report_result(log_id))
+profiler = RequestProfiler.from_env()
+trending = TrendingIndicators()
+cascade = Cascade.from_env()
+fragments = FragmentCache()
+
+
+def _warm_trending(until_id):
+    """
+    Replay the last day of logs so a restart doesn't blank the trends.
+    Rows after `until_id` (the last id before startup) are counted live by
+    full_analysis, so the replay stops there instead of counting them twice.
+    """
+    since = time.time() - 24 * 3600
+    pack = rule_packs.current_pack()
+    for message, analyzed_at in iter_messages_since(
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(since)), until_id):
+        at = time.mktime(time.strptime(analyzed_at, "%Y-%m-%d %H:%M:%S"))
+        trending.observe(extract_indicators(message, pack=pack), now=at)
+
+
+threading.Thread(target=_warm_trending, args=(get_last_log_id(),),
+                 name="trending-warmup", daemon=True).start()
+
+if log_shards.ENABLED:
+    log_shards.start_compactor(
+        DB_PATH,
+        interval=float(os.environ.get("FRAUDSHIELD_COMPACT_INTERVAL", 30)),
+        on_error=lambda e: app.logger.error("Log shard compaction failed: %s", e),
+    )
 
-
-# ── HELPERS ──────────────────────────────────────────────
-def get_risk_level(score):
-    if score <= 30:   return "LOW"
-    elif score <= 70: return "MEDIUM"
-    else:             return "HIGH"
+rule_packs.current_pack()
+if os.environ.get("FRAUDSHIELD_RULES_WATCH", "1") == "1":
+    rule_packs.start_watcher(
+        interval=float(os.environ.get("FRAUDSHIELD_RULES_WATCH_INTERVAL", 2)),
+        on_error=lambda e: app.logger.error("Rule pack reload failed: %s", e),
+    )
 
 
+# ── HELPERS ──────────────────────────────────────────────
 def generate_explanation(risk_level, rule_score, ai_score, detected_phrases, multilingual_flags):
     if risk_level == "HIGH":
         base = ("THREAT CONFIRMED — This message exhibits multiple high-confidence fraud "
@@ -42,75 +95,187 @@ def generate_explanation(risk_level, rule_score, ai_score, detected_phrases, mul
 
     if rule_score > 60:
         base += " Rule engine detected a dense cluster of scam keywords."
-    if ai_score > 65:
+    if ai_score is None:
+        base += " The rule engines were conclusive, so the AI model was not consulted."
+    elif ai_score > 65:
         base += " AI model classifies this with high fraud probability."
     if multilingual_flags:
         base += f" Regional language fraud signals detected."
-    if rule_score < 15 and ai_score < 35:
+    if rule_score < 15 and ai_score is not None and ai_score < 35:
         base += " Both detection layers returned low-risk readings."
 
     return base
 
 
-def full_analysis(message):
-    """Run all detection engines on a message and return complete result dict."""
-    # Core engines
-    rule_score, detected_phrases = analyze_message(message)
-    ai_score = get_ai_score(message)
-
-    # Feature 4: Multilingual detection
-    multi_score, multilingual_flags = analyze_multilingual(message)
-
-    # Adjust rule score with multilingual bonus
-    combined_rule = min(100, rule_score + multi_score)
-
-    # Weighted final score
-    final_score = round(0.6 * combined_rule + 0.4 * ai_score)
-    risk_level  = get_risk_level(final_score)
-
-    # Feature 5: URL deep inspection
-    url_analysis = inspect_urls_in_message(message)
-
-    # Boost score if URLs are very suspicious
-    if url_analysis:
-        max_url_risk = max(u['risk_score'] for u in url_analysis)
-        if max_url_risk >= 70:
-            final_score = min(100, final_score + 10)
-            risk_level  = get_risk_level(final_score)
-
-    # Feature 8: Explainable AI
-    ai_explanation = get_ai_explanation(message, _pipeline)
-
-    highlighted_message = highlight_message(message, detected_phrases)
-    explanation = generate_explanation(
-        risk_level, combined_rule, ai_score, detected_phrases, multilingual_flags
-    )
+# Rendered pages only change with the code, model, templates or asset
+# build between deploys, so that part of the ETag is computed once.
+BUILD_FINGERPRINT = build_fingerprint(
+    model_fingerprint(), sorted(asset_manifest.items()),
+    template_dir=os.path.join(app.root_path, "templates"),
+)
+
+
+def content_version():
+    """ETag for views derived from analysis_logs (one indexed MAX(id) lookup)."""
+    return f"{get_data_version()}-{rule_packs.current_pack().content_hash[:8]}-{BUILD_FINGERPRINT}"
+
+
+def dashboard_version():
+    # Active campaigns are a rolling 7-day window, so roll the token hourly too
+    return f"{content_version()}-{time.strftime('%Y%m%d%H')}"
+
+
+def has_admin_token():
+    """True when X-Admin-Token matches $FRAUDSHIELD_ADMIN_TOKEN (unset = nobody)."""
+    expected = os.environ.get("FRAUDSHIELD_ADMIN_TOKEN", "")
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(expected) and hmac.compare_digest(supplied, expected)
+
+
+def admin_required(view):
+    """Allow the view only with a valid admin token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not has_admin_token():
+            return jsonify({"error": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# Result fields that need an optional stage; everything else comes from the
+# scoring stages, which always run (the verdict and the log row need them).
+LAZY_FIELDS = {
+    "ai_explanation":      "ai_explanation",
+    "highlighted_message": "highlight",
+    "explanation":         "explanation",
+}
+RESULT_FIELDS = [
+    "message", "rule_score", "ai_score", "final_score", "risk_level", "detected_phrases",
+    "multilingual_flags", "highlighted_message", "explanation", "url_analysis",
+    "ai_explanation", "long_input", "degraded", "rule_pack_version", "cascade", "report_token",
+]
+
+
+DEFAULT_API_FIELDS = ["final_score", "risk_level"]
+STREAM_FIELDS = ["final_score", "risk_level", "rule_score", "ai_score", "detected_phrases",
+                 "multilingual_flags", "url_analysis"]
+
+
+def full_analysis(message, degraded=False, fields=None):
+    """
+    Run all detection engines on a message and return complete result dict.
+    degraded=True (load shedding) keeps the rule, AI, multilingual and URL
+    scores but skips explainability, URL finding details and highlighting.
+
+    `fields` projects the result to those keys and runs only the optional
+    stages they need (see LAZY_FIELDS); None means every field.
+    """
+    wanted = set(RESULT_FIELDS if fields is None else fields)
+    stages = {LAZY_FIELDS[f] for f in wanted if f in LAZY_FIELDS}
+
+    # One rule pack for the whole analysis, even if a reload lands mid-request
+    pack = rule_packs.current_pack()
+
+    long_input = None
+    if len(message) > LONG_INPUT_THRESHOLD:
+        # Long-input mode: stream overlapping windows, stop once one is HIGH
+        core = analyze_long_input(
+            message, lambda text: score_core(text, pack),
+            is_conclusive=lambda w: get_risk_level(w["final_score"]) == "HIGH",
+            pack=pack,
+        )
+        long_input = core["long_input"]
+        scanned_text = message[:long_input["scanned_upto"]]
+        display_text, long_input["truncated"] = cap_text(message)
+        verdict = finish_verdict(core, scanned_text, pack)
+    else:
+        scanned_text = display_text = message
+        verdict = cascade.verdict(message, pack) if cascade.enabled else finish_verdict(
+            score_core(message, pack), message, pack)
+
+    detected_phrases   = verdict["detected_phrases"]
+    multilingual_flags = verdict["multilingual_flags"]
+    combined_rule      = verdict["combined_rule"]
+    ai_score           = verdict["ai_score"]
+    final_score        = verdict["final_score"]
+    risk_level         = verdict["risk_level"]
+    url_spans          = verdict["url_spans"]
+    url_analysis       = verdict["url_analysis"]
+
+    # A cascade that skipped URL inspection leaves domains to the text scan
+    skipped = verdict["cascade"]["skipped"] if verdict["cascade"] else []
+    trending.observe(extract_indicators(
+        scanned_text, None if "urls" in skipped else url_analysis, pack))
+
+    if degraded:
+        url_analysis = [dict(u, findings=[]) for u in url_analysis]
 
     # Feature 7: store for PDF
     result = {
-        "message":            message,
+        "message":            display_text,
         "rule_score":         combined_rule,
         "ai_score":           ai_score,
         "final_score":        final_score,
         "risk_level":         risk_level,
         "detected_phrases":   detected_phrases,
         "multilingual_flags": multilingual_flags,
-        "highlighted_message":highlighted_message,
-        "explanation":        explanation,
         "url_analysis":       url_analysis,
-        "ai_explanation":     ai_explanation,
+        "long_input":         long_input,
+        "degraded":           degraded,
+        "rule_pack_version":  pack.version,
+        "cascade":            verdict["cascade"],
     }
 
-    # Persist to database (Feature 6)
+    # Optional stages, only when a requested field needs them
+    if "ai_explanation" in stages:
+        # Feature 8: Explainable AI
+        # (a cascade decided by the rules alone never consulted the model)
+        skip = degraded or "model" in skipped
+        result["ai_explanation"] = None if skip else get_ai_explanation(display_text)
+    if "highlight" in stages:
+        if degraded:
+            result["highlighted_message"] = html.escape(display_text)
+        else:
+            limit = len(display_text)
+            spans = [sp for sp in verdict["rule_spans"] + verdict["multi_spans"] + url_spans
+                     if sp[1] <= limit]
+            result["highlighted_message"] = highlight_spans(display_text, spans)
+    if "explanation" in stages:
+        result["explanation"] = explanation_for(result)
+
+    # Persist to database (Feature 6) — long inputs are stored capped
     all_flags = detected_phrases + multilingual_flags
-    log_analysis(message, combined_rule, ai_score, final_score, risk_level, all_flags)
+    log_id = log_analysis(display_text, combined_rule, ai_score, final_score, risk_level, all_flags,
+                          rule_pack_version=pack.version, result=result)
+    result["report_token"] = report_cache.token_for(log_id)
+    fragments.invalidate()
+
+    if fields is None:
+        return result
+    return {f: result[f] for f in fields}
+
+
+def explanation_for(result):
+    """Prose verdict explanation built from a (possibly stored) result."""
+    return generate_explanation(
+        result["risk_level"], result["rule_score"], result["ai_score"],
+        result["detected_phrases"], result["multilingual_flags"]
+    )
+
 
+def load_report_result(log_id):
+    """Retained result for a report, filling in stages a projected call skipped."""
+    result = get_result(log_id)
+    if result is not None and "explanation" not in result:
+        result["explanation"] = explanation_for(result)
     return result
 
 
 # ── ROUTES ───────────────────────────────────────────────
 
 @app.route("/", methods=["GET", "POST"])
+@admission_controlled(admission)
+@profiled(profiler, has_admin_token)
 def index():
     result = None
     ocr_error = None
@@ -122,7 +287,7 @@ def index():
             image_bytes = uploaded.read()
             extracted_text, success, err = extract_text_from_image(image_bytes)
             if success and extracted_text:
-                result = full_analysis(extracted_text)
+                result = full_analysis(extracted_text, degraded=g.degraded)
             else:
                 ocr_error = err or "Could not extract text from image."
 
@@ -130,54 +295,85 @@ def index():
         else:
             message = request.form.get("message", "").strip()
             if message:
-                result = full_analysis(message)
+                result = full_analysis(message, degraded=g.degraded)
 
     return render_template("index.html", result=result, ocr_error=ocr_error)
 
 
+def fragment(version, key, template, **context):
+    """Render a page partial once per data version; `context` values are loaders."""
+    return fragments.get(key, version, lambda: Markup(render_template(
+        template, **{name: load() for name, load in context.items()})))
+
+
 @app.route("/logs")
+@conditional_get(content_version, REVALIDATE)
 def logs():
-    recent = get_recent_logs(limit=20)
-    stats  = get_stats()
-    return render_template("logs.html", logs=recent, stats=stats)
+    version = content_version()
+    stats = fragments.get("stats", version, get_stats)
+    logs_table = fragment(version, "logs_table", "_logs_table.html",
+                          logs=lambda: get_recent_logs(limit=20))
+    return render_template("logs.html", logs_table=logs_table, stats=stats)
 
 
 @app.route("/dashboard")
+@conditional_get(dashboard_version, REVALIDATE)
 def dashboard():
     """Feature 3: Live Threat Dashboard"""
-    stats    = get_stats()
-    top_flags = get_top_flags(12)
-    recent   = get_recent_logs(limit=50)
-    return render_template("dashboard.html", stats=stats, top_flags=top_flags, recent=recent)
+    version = content_version()
+    stats     = fragments.get("stats", version, get_stats)
+    top_flags = fragments.get("top_flags:12", version, lambda: get_top_flags(12))
+    flag_bars = fragment(version, "dashboard_flags", "_dashboard_flags.html",
+                         top_flags=lambda: top_flags)
+    activity_feed = fragment(version, "dashboard_activity", "_dashboard_activity.html",
+                             recent=lambda: get_recent_logs(limit=15))
+    campaigns = get_active_campaigns(days=7, limit=8)
+    return render_template("dashboard.html", stats=stats, top_flags=top_flags,
+                           flag_bars=flag_bars, activity_feed=activity_feed, campaigns=campaigns)
 
 
 @app.route("/community")
+@conditional_get(content_version, SHARED_SHORT)
 def community():
     """Feature 9: Community Scam Feed"""
-    feed      = get_community_feed(limit=20)
-    top_flags = get_top_flags(10)
-    stats     = get_stats()
-    return render_template("community.html", feed=feed, top_flags=top_flags, stats=stats)
-
-
-@app.route("/download-report", methods=["POST"])
-def download_report():
-    """Feature 7: PDF Forensic Report download"""
-    import json
-    result_json = request.form.get("result_data")
-    if not result_json:
-        return "No data", 400
-    result = json.loads(result_json)
-    pdf_bytes = generate_pdf_report(result)
-    return send_file(
+    version = content_version()
+    feed      = fragments.get("community_feed:20", version, lambda: get_community_feed(limit=20))
+    top_flags = fragments.get("top_flags:10", version, lambda: get_top_flags(10))
+    stats     = fragments.get("stats", version, get_stats)
+    feed_cards = fragment(version, "community_feed", "_community_feed.html", feed=lambda: feed)
+    flag_bars = fragment(version, "community_flags", "_community_flags.html",
+                         top_flags=lambda: top_flags)
+    return render_template("community.html", feed=feed, feed_cards=feed_cards,
+                           flag_bars=flag_bars, stats=stats)
+
+
+@app.route("/report/<token>.pdf")
+def report_pdf(token):
+    """Feature 7: PDF report for a retained analysis, rendered once and cached."""
+    log_id = report_cache.log_id_for(token)
+    if log_id is None:
+        return "Report not found or expired", 404
+    try:
+        pdf_bytes = report_cache.get(log_id)
+    except RenderTimeout:
+        resp = Response("Report is still rendering, retry shortly.", status=503,
+                        mimetype="text/plain")
+        resp.headers["Retry-After"] = "2"
+        return resp
+    if pdf_bytes is None:
+        return "Report not found or expired", 404
+    resp = send_file(
         io.BytesIO(pdf_bytes),
         mimetype="application/pdf",
         as_attachment=True,
-        download_name=f"fraudshield_report_{result.get('risk_level','UNKNOWN')}.pdf"
+        download_name=f"fraudshield_report_{log_id}.pdf"
     )
+    resp.headers["Cache-Control"] = "private, max-age=86400"
+    return resp
 
 
 @app.route("/api/stats")
+@conditional_get(content_version, SHARED_SHORT)
 def api_stats():
     """Live stats API for dashboard charts."""
     stats     = get_stats()
@@ -190,5 +386,207 @@ def api_stats():
     })
 
 
+@app.route("/api/analyze", methods=["POST"])
+@admission_controlled(admission)
+@profiled(profiler, has_admin_token)
+def api_analyze():
+    """
+    JSON analysis API. Body: {"message": "...", "fields": ["final_score", ...]}
+    (or ?fields=final_score,risk_level). Only the stages the requested
+    fields need are run; the default is final_score + risk_level.
+    """
+    payload = request.get_json(silent=True) or {}
+    message = payload.get("message") if isinstance(payload, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return jsonify({"error": "JSON body with a non-empty 'message' is required"}), 400
+
+    if "fields" in payload:
+        fields = payload["fields"]
+    elif "fields" in request.args:
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+    else:
+        fields = DEFAULT_API_FIELDS
+    if (not isinstance(fields, list) or not fields
+            or not all(isinstance(f, str) for f in fields)):
+        return jsonify({"error": "'fields' must be a non-empty list of field names",
+                        "available": RESULT_FIELDS}), 400
+    unknown = [f for f in fields if f not in RESULT_FIELDS]
+    if unknown:
+        return jsonify({"error": f"unknown fields: {', '.join(unknown)}",
+                        "available": RESULT_FIELDS}), 400
+
+    return jsonify(full_analysis(message.strip(), degraded=g.degraded, fields=fields))
+
+
+@app.route("/api/stream", methods=["POST"])
+@profiled(profiler, has_admin_token)
+def api_stream():
+    """
+    Chunked NDJSON ingest for gateway firehoses: one JSON message per line
+    in, one NDJSON verdict per line out, in order, on the same response.
+    The stream holds one stream slot (not an in-flight one) for its lifetime.
+    """
+    mode = admission.admit_stream()
+    if mode is None:
+        return shed_response(admission)
+
+    def analyze(message):
+        # Lean per-line result: the stream never needs XAI or highlight HTML
+        r = full_analysis(message, fields=STREAM_FIELDS)
+        return {
+            "final_score":        r["final_score"],
+            "risk_level":         r["risk_level"],
+            "rule_score":         r["rule_score"],
+            "ai_score":           r["ai_score"],
+            "detected_phrases":   r["detected_phrases"],
+            "multilingual_flags": r["multilingual_flags"],
+            "max_url_risk":       max((u["risk_score"] for u in r["url_analysis"]), default=0),
+        }
+
+    def generate():
+        try:
+            for line in stream_results(request.stream, analyze,
+                                       on_latency=lambda ms: admission.observe(ms, mode)):
+                yield line
+        finally:
+            admission.release_stream()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no", "Cache-Control": "no-store"},
+    )
+
+
+@app.route("/admin/rules", methods=["GET"])
+@admin_required
+def admin_rules():
+    """Active rule pack version in this worker."""
+    pack = rule_packs.current_pack()
+    return jsonify({"version": pack.version, "declared_version": pack.declared_version,
+                    "path": rule_packs.RULES_PATH})
+
+
+@app.route("/admin/rules/reload", methods=["POST"])
+@admin_required
+def admin_rules_reload():
+    """
+    Hot-swap the rule pack. With a JSON body, validate it and install it as
+    the new pack file (other workers follow via their file watchers);
+    without a body, re-read the file from disk.
+    """
+    try:
+        raw = request.get_data()
+        pack = rule_packs.install(raw) if raw.strip() else rule_packs.reload()
+    except rule_packs.RulePackError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"version": pack.version, "declared_version": pack.declared_version})
+
+
+@app.route("/admin/profiles")
+@admin_required
+def admin_profiles():
+    """Saved request profiles in this process's profile directory, newest first."""
+    return jsonify({"profiles": profiler.list_profiles()})
+
+
+@app.route("/admin/profiles/<request_id>.<fmt>")
+@admin_required
+def admin_profile_file(request_id, fmt):
+    """
+    One profile artifact: `collapsed` (flamegraph.pl / speedscope input),
+    `memory` (tracemalloc diff) or `json` (metadata).
+    """
+    path = profiler.profile_path(request_id, fmt)
+    if path is None:
+        return jsonify({"error": "No such profile"}), 404
+    return send_file(path, mimetype=PROFILE_FORMATS[fmt][1], as_attachment=fmt != "json",
+                     download_name=os.path.basename(path))
+
+
+@app.route("/api/health")
+def api_health():
+    """Load-shedding, cascade, batching and page-cache state of this worker (for load balancers / dashboards)."""
+    return jsonify({"status": "ok", "admission": admission.stats(), "cascade": cascade.stats(),
+                    "explain_batching": explain_batcher.stats(), "fragments": fragments.stats()})
+
+
+@app.route("/api/trending")
+def api_trending():
+    """
+    Most-reported phone numbers, UPI handles and link domains over the
+    last hour or day (?window=1h|24h&kind=phone&limit=10). Counts come
+    from this worker's sketches, which the response says explicitly.
+    """
+    window = request.args.get("window", "1h")
+    if window not in TREND_WINDOWS:
+        return jsonify({"error": f"window must be one of {', '.join(TREND_WINDOWS)}"}), 400
+    kind = request.args.get("kind")
+    if kind and kind not in TREND_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(TREND_KINDS)}"}), 400
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+    top = trending.top(window, kinds=[kind] if kind else TREND_KINDS, limit=limit)
+    return jsonify({"window": window, "trending": top,
+                    "scope": "worker", "worker_pid": os.getpid()})
+
+
+@app.route("/api/stats/timeseries")
+def api_stats_timeseries():
+    """Trend buckets, e.g. ?window=24h&bucket=5m (read from rollup tables)."""
+    try:
+        window = parse_duration(request.args.get("window", "24h"))
+        bucket = parse_duration(request.args.get("bucket", "1h"))
+        points = get_stats_timeseries(
+            window, bucket, include_flags=request.args.get("flags") == "1"
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"window": window, "bucket": bucket, "points": points})
+
+
+@app.route("/api/export/logs")
+@admin_required
+def api_export_logs():
+    """Stream analysis_logs as Arrow IPC, incrementally from ?since_id=N."""
+    import analytics_export
+    if analytics_export.pa is None:
+        return jsonify({"error": "pyarrow is not installed on this server"}), 501
+    since_id = max(request.args.get("since_id", 0, type=int), 0)
+    until_id = analytics_export.snapshot_max_id()
+    return Response(
+        analytics_export.iter_arrow_stream(since_id, until_id),
+        mimetype="application/vnd.apache.arrow.stream",
+        headers={
+            "X-Export-Watermark": str(until_id),
+            "Content-Disposition": f"attachment; filename=analysis_logs_{since_id}_{until_id}.arrows",
+        },
+    )
+
+
+@app.route("/api/logs/search")
+def api_logs_search():
+    """Full-text search over past analyses, ranked, with highlighted snippets."""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query parameter 'q'"}), 400
+
+    risk_level = request.args.get("risk", "").upper() or None
+    if risk_level and risk_level not in ("LOW", "MEDIUM", "HIGH"):
+        return jsonify({"error": "risk must be LOW, MEDIUM or HIGH"}), 400
+
+    limit  = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    order  = "recent" if request.args.get("sort") == "recent" else "rank"
+
+    results = search_logs(
+        query,
+        risk_level=risk_level,
+        date_from=request.args.get("from") or None,
+        date_to=request.args.get("to") or None,
+        limit=limit, offset=offset, order=order,
+    )
+    return jsonify({"query": query, "count": len(results), "results": results})
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,247 @@
+"""
+ASGI serving mode:  uvicorn asgi:app --host 0.0.0.0 --port 10000
+(or gunicorn asgi:app -k uvicorn.workers.UvicornWorker, one worker per box).
+
+The event loop owns the network side of every request: request bodies
+(screenshot uploads included) are read and responses are sent with
+`await`, so slow or idle clients cost a coroutine, not a worker. Only once
+the whole body is in does the request run through the same Flask routes,
+on one of two bounded thread pools:
+
+    cpu   POST /, /api/analyze, /api/stream — the detection engines
+          and OCR
+          (FRAUDSHIELD_ASGI_CPU_WORKERS, default: number of cores)
+    io    everything else — page renders and SQLite reads
+          (FRAUDSHIELD_ASGI_IO_WORKERS, default 32)
+
+One process therefore shares one copy of the model between all
+connections while CPU work stays capped at the core count. When more than
+FRAUDSHIELD_ASGI_MAX_QUEUE requests are waiting for or holding a pool
+thread, new ones get 503 + Retry-After, as with admission control. Bodies
+over FRAUDSHIELD_ASGI_MAX_BODY_MB (default 16) get 413. Responses are
+sent chunk by chunk as the view produces them, so /api/export/logs and
+other generator responses go out without being assembled in memory; the
+pool thread is held until the last chunk has been handed to the server.
+
+/api/stream is the exception on the request side: its body is bridged
+incrementally instead of being buffered, so the view reads it as it
+arrives and a stream holds one CPU-pool thread for its whole duration,
+slow client included (like the admission stream slot it also holds). A stream
+has no overall size: the body cap does not apply to it, and memory is
+bounded by ndjson_stream.MAX_LINE_BYTES per line instead.
+"""
+import io
+import os
+import sys
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+
+CPU_PATHS       = ("/api/analyze", "/api/stream")
+STREAMING_PATHS = ("/api/stream",)
+RETRY_AFTER     = 2
+
+
+def _is_cpu_bound(method, path):
+    return path in CPU_PATHS or (method == "POST" and path == "/")
+
+
+class _StreamingBody(io.RawIOBase):
+    """wsgi.input for a pool thread that pulls body chunks from the event loop."""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b""
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                self._more = False
+                break
+            self._buffer = message.get("body", b"")
+            self._more = message.get("more_body", False)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _environ(scope, body, content_length=None):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD":    scope["method"],
+        "SCRIPT_NAME":       scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO":         scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING":      scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME":       str(server[0]),
+        "SERVER_PORT":       str(server[1]),
+        "SERVER_PROTOCOL":   f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR":       str(client[0]),
+        "wsgi.version":      (1, 0),
+        "wsgi.url_scheme":   scope.get("scheme", "http"),
+        "wsgi.input":        body,
+        "wsgi.errors":       sys.stderr,
+        "wsgi.multithread":  True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once":     False,
+        "wsgi.input_terminated": content_length is None,
+    }
+    for name, value in scope.get("headers", []):
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name == "content-length":
+            if content_length is not None:
+                environ["CONTENT_LENGTH"] = value
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if content_length is not None:
+        environ["CONTENT_LENGTH"] = str(content_length)
+    return environ
+
+
+def _start_message(status, headers):
+    return {
+        "type": "http.response.start",
+        "status": int(status.split(" ", 1)[0]),
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    }
+
+
+class AsgiBridge:
+    def __init__(self, wsgi_app, cpu_workers=None, io_workers=32, max_queue=512,
+                 max_body=16 * 1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers or os.cpu_count() or 1,
+                                           thread_name_prefix="asgi-cpu")
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="asgi-io")
+        self.queued = 0    # requests waiting for or holding a pool thread
+
+    @classmethod
+    def from_env(cls, wsgi_app):
+        cpu = int(os.environ.get("FRAUDSHIELD_ASGI_CPU_WORKERS", 0))
+        return cls(
+            wsgi_app,
+            cpu_workers=cpu or None,
+            io_workers=int(os.environ.get("FRAUDSHIELD_ASGI_IO_WORKERS", 32)),
+            max_queue=int(os.environ.get("FRAUDSHIELD_ASGI_MAX_QUEUE", 512)),
+            max_body=int(os.environ.get("FRAUDSHIELD_ASGI_MAX_BODY_MB", 16)) * 1024 * 1024,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.cpu_pool.shutdown(wait=True)
+                self.io_pool.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        path = scope["path"]
+        if self.queued >= self.max_queue:
+            await self._error(send, path, 503, "Service saturated, retry shortly.",
+                              [("Retry-After", str(RETRY_AFTER))])
+            return
+
+        loop = asyncio.get_running_loop()
+        pool = self.cpu_pool if _is_cpu_bound(scope["method"], path) else self.io_pool
+
+        if path in STREAMING_PATHS:
+            body = io.BufferedReader(_StreamingBody(receive, loop))
+            length = None
+        else:
+            declared = dict(scope.get("headers", [])).get(b"content-length", b"")
+            if declared.isdigit() and int(declared) > self.max_body:
+                await self._error(send, path, 413, "Request body too large.")
+                return
+
+            chunks, length = [], 0
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunk = message.get("body", b"")
+                length += len(chunk)
+                if length > self.max_body:
+                    await self._error(send, path, 413, "Request body too large.")
+                    return
+                chunks.append(chunk)
+                if not message.get("more_body", False):
+                    break
+            body = io.BytesIO(b"".join(chunks))
+
+        environ = _environ(scope, body, length)
+        self.queued += 1
+        try:
+            await loop.run_in_executor(pool, self._run, environ, send, loop)
+        finally:
+            self.queued -= 1
+
+    def _run(self, environ, send, loop):
+        """
+        Run a request in a pool thread, forwarding each chunk as it is
+        produced; waiting on send() throttles the view. The status line goes
+        out with the first chunk, or on its own for an empty body.
+        """
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        pending = []   # start message not sent yet
+
+        def write(data):
+            if pending:
+                emit(pending.pop())
+            emit({"type": "http.response.body", "body": data, "more_body": True})
+
+        def start_response(status, headers, exc_info=None):
+            pending[:] = [_start_message(status, headers)]
+            return write
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    write(chunk)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        if pending:
+            emit(pending.pop())
+        emit({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def _error(send, path, status, text, headers=()):
+        if path.startswith("/api/"):
+            payload = {"error": text}
+            if status == 503:
+                payload["retry_after"] = RETRY_AFTER
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        else:
+            body, content_type = text.encode("utf-8"), "text/plain; charset=utf-8"
+        headers = [("Content-Type", content_type), ("Content-Length", str(len(body))), *headers]
+        await send(_start_message(f"{status} ", headers))
+        await send({"type": "http.response.body", "body": body})
+
+
+app = AsgiBridge.from_env(flask_app)
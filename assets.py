@@ -0,0 +1,128 @@
+"""
+Fingerprinted, precompressed static assets.
+`python assets.py` copies each file in static/ to static/dist/ under a
+content-hashed name (style.3f9c0a1b.css) and writes .gz and .br variants
+next to it, plus a manifest mapping original names to hashed ones.
+
+Templates call asset_url('style.css'); with a manifest present that is
+/assets/style.3f9c0a1b.css, served from the precompressed variant the
+client accepts with `Cache-Control: immutable`. Without a build the helper
+falls back to the plain /static URL, so development needs no extra step.
+
+    python assets.py            # run after changing anything in static/
+"""
+import os
+import gzip
+import json
+import hashlib
+import mimetypes
+
+from flask import request, send_file, abort, url_for
+
+STATIC_DIR    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR      = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+ASSET_TYPES   = (".css", ".js", ".svg")
+ONE_YEAR      = 365 * 24 * 3600
+
+# (encoding, file suffix), in order of preference
+VARIANTS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def _compress_brotli(data):
+    try:
+        import brotli
+    except ImportError:  # optional, gzip alone still works
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Write hashed + precompressed copies of every asset. Returns the manifest."""
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for name in sorted(os.listdir(static_dir)):
+        src = os.path.join(static_dir, name)
+        if not os.path.isfile(src) or not name.endswith(ASSET_TYPES):
+            continue
+        with open(src, "rb") as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:8]}{ext}"
+        out = os.path.join(dist_dir, hashed)
+
+        with open(out, "wb") as f:
+            f.write(data)
+        # mtime=0 keeps the .gz byte-identical across builds
+        with open(out + ".gz", "wb") as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        compressed = _compress_brotli(data)
+        if compressed is not None:
+            with open(out + ".br", "wb") as f:
+                f.write(compressed)
+        manifest[name] = hashed
+
+    # Drop outputs from earlier builds that no longer match any source
+    keep = set(manifest.values())
+    for name in os.listdir(dist_dir):
+        base = name[:-3] if name.endswith((".gz", ".br")) else name
+        if name != "manifest.json" and base not in keep:
+            os.remove(os.path.join(dist_dir, name))
+
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+    return manifest
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def register_assets(app):
+    """Add the asset_url() template helper and the /assets route to `app`."""
+    manifest = load_manifest()
+    served = set(manifest.values())
+
+    def asset_url(name):
+        hashed = manifest.get(name)
+        if hashed is None:
+            return url_for("static", filename=name)
+        return url_for("hashed_asset", filename=hashed)
+
+    @app.route("/assets/<filename>")
+    def hashed_asset(filename):
+        if filename not in served:
+            abort(404)
+        path = os.path.join(DIST_DIR, filename)
+        encoding = None
+        for enc, suffix in VARIANTS:
+            if request.accept_encodings[enc] and os.path.exists(path + suffix):
+                path, encoding = path + suffix, enc
+                break
+
+        resp = send_file(path, mimetype=mimetypes.guess_type(filename)[0], conditional=True)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+        return resp
+
+    app.jinja_env.globals["asset_url"] = asset_url
+    return manifest
+
+
+if __name__ == "__main__":
+    built = build()
+    for name, hashed in built.items():
+        path = os.path.join(DIST_DIR, hashed)
+        sizes = [f"{name:<12} → {hashed:<24} {os.path.getsize(path):>7} B"]
+        for enc, suffix in VARIANTS:
+            if os.path.exists(path + suffix):
+                sizes.append(f"{enc} {os.path.getsize(path + suffix):>6} B")
+        print("  ".join(sizes))
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of the detection stages.
+Times each engine over the training corpus (plus URL-bearing variants)
+and prints microseconds per message, so regressions in any one stage are
+visible without a running server.
+
+    python benchmark.py              # default 200 rounds
+    python benchmark.py --rounds 50
+
+URL inspection is also timed per URL, with the rule pack's brand index and
+with one grown to thousands of synthetic brands (lookups should not slow).
+"""
+import sys
+import time
+import random
+import string
+import argparse
+
+from nlp_model      import TRAINING_DATA, clean_text, get_pipeline, get_scorer
+from rule_engine    import analyze_message_spans, highlight_spans
+from multilingual   import analyze_multilingual_spans
+from url_inspector  import inspect_urls_in_message, extract_url_spans, extract_urls, analyze_url
+from rule_packs     import current_pack
+from brand_index    import BrandIndex
+from explainability import get_ai_explanation
+
+
+def corpus():
+    messages = [msg for msg, _ in TRAINING_DATA]
+    messages += [
+        "Dear customer, verify at http://hdfc-secure-login.xyz/kyc/update now",
+        "तुरंत KYC update karo, otp share karo: https://bit.ly/3xYz",
+        "Your order ships today. Track at https://amazon.in/orders/123",
+    ]
+    return messages
+
+
+def _time(fn, messages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for msg in messages:
+            fn(msg)
+    return (time.perf_counter() - start) / (rounds * len(messages)) * 1e6
+
+
+def stages():
+    pipeline = get_pipeline()
+    scorer = get_scorer()
+
+    def highlight(msg):
+        _, _, rule_spans = analyze_message_spans(msg)
+        highlight_spans(msg, rule_spans + extract_url_spans(msg))
+
+    return [
+        ("rule engine",          analyze_message_spans),
+        ("multilingual",         analyze_multilingual_spans),
+        ("ai score (sklearn)",   lambda m: pipeline.predict_proba([clean_text(m)])),
+        ("ai score (compiled)",  lambda m: scorer.proba(clean_text(m))),
+        ("url inspection",       inspect_urls_in_message),
+        ("highlight",            highlight),
+        ("explainability",       lambda m: get_ai_explanation(m, pipeline)),
+    ]
+
+
+def url_corpus():
+    urls = [url for msg in corpus() for url in extract_urls(msg)]
+    urls += [
+        "http://hdfcbannk.xyz/login", "https://sbl-online.com/kyc/verify",
+        "http://xn--mazon-3ve.in/refund", "https://github.com/org/repo",
+        "https://mail.google.com/mail/u/0", "http://192.168.4.20/claim",
+    ]
+    return urls
+
+
+def _brand_lookup(index):
+    def lookup(url):
+        domain = url.split("/")[2]
+        return index.exact_brand(domain) or index.lookalike(domain)
+    return lookup
+
+
+def url_stages(grown_to=5000):
+    pack = current_pack()
+    rng = random.Random(0)
+    brands = list(pack.brand_keywords) + [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12)))
+        for _ in range(grown_to - len(pack.brand_keywords))
+    ]
+    grown = BrandIndex(brands, pack.legit_domains)
+    return [
+        ("analyze_url",                               lambda u: analyze_url(u, pack)),
+        (f"brand lookup ({len(pack.brand_index)} brands)", _brand_lookup(pack.brand_index)),
+        (f"brand lookup ({len(grown)} brands)",       _brand_lookup(grown)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency benchmark.")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = corpus()
+    print(f"{len(messages)} messages × {args.rounds} rounds")
+    print(f"{'stage':<24}{'µs/msg':>10}")
+    for name, fn in stages():
+        fn(messages[0])  # warm caches / lazy loads
+        print(f"{name:<24}{_time(fn, messages, args.rounds):>10.1f}")
+
+    urls = url_corpus()
+    print(f"\n{len(urls)} URLs × {args.rounds} rounds")
+    print(f"{'stage':<32}{'µs/url':>10}")
+    for name, fn in url_stages():
+        fn(urls[0])
+        print(f"{name:<32}{_time(fn, urls, args.rounds):>10.1f}")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
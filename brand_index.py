@@ -0,0 +1,244 @@
+"""
+Brand lookup index for the URL inspector.
+Domain tokens are matched against the rule pack's brand keywords and the
+names of its legitimate domains in two ways:
+
+  * exact — a brand appearing anywhere in the domain (the original
+    substring rule), answered from a set per brand length instead of a
+    scan over every brand;
+  * lookalike — a token within a small edit distance of a brand after
+    homoglyph normalisation (0→o, 1/i→l, Cyrillic а→a, xn-- labels
+    decoded, ...), so "hdfcbannk" and "sbl-online" are caught.
+
+Lookalikes use a symmetric-delete index: every brand is stored under all
+of its deletions up to its allowed distance, and a token looks up its own
+deletions, so a query costs the same whether the pack lists 20 brands or
+20,000. Names shorter than MIN_EDIT_LENGTH must match exactly after
+normalisation: one edit to "sbi" hits ordinary words, and one edit to a
+five- or six-letter brand hits real ones (kodak → KOTAK, canada → CANARA).
+Two edits are only allowed from MIN_DISTANCE2_LENGTH letters up. When a
+token shares a generic prefix with a brand ("online" in ONLINESBI), only
+the rest is compared, with the allowance of that rest's length: otherwise
+onlinesql or onlinesale would pass for onlinesbi on the strength of the
+word "online".
+`python brand_index.py` checks the current pack against BENIGN_DOMAINS
+(must not match) and LOOKALIKE_DOMAINS (must match).
+"""
+import sys
+
+# Characters that render like (or are typed instead of) a Latin letter
+HOMOGLYPHS = str.maketrans({
+    "0": "o", "1": "l", "i": "l", "|": "l", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "$": "s", "@": "a",
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "і": "l", "ј": "j", "ѕ": "s", "ԁ": "d", "ӏ": "l",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "ι": "l", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x",
+})
+DIGRAPHS = (("rn", "m"), ("vv", "w"))
+
+MIN_TOKEN = 3
+MAX_TOKEN = 24
+MIN_DOMAIN_NAME = 6     # shorter legit-domain names ("vi", "gov") are too generic
+MIN_EDIT_LENGTH = 7     # shorter names only match via homoglyphs
+MIN_DISTANCE2_LENGTH = 11
+# Common words brands start with; never the distinctive part of a name
+GENERIC_PREFIXES = ("online", "bank")
+
+# Real domains without a brand in their name; none may be reported as a lookalike
+BENIGN_DOMAINS = (
+    "kodak.com", "canada.ca", "canary.io", "air-canada.com", "canon.com", "kotlin.org",
+    "paypal.com", "payu.in", "airbnb.com", "google.com", "github.com",
+    "stackoverflow.com", "wikipedia.org", "zomato.com", "swiggy.com", "myntra.com",
+    "netflix.com", "hotstar.com", "youtube.com", "linkedin.com", "facebook.com",
+    "instagram.com", "twitter.com", "whatsapp.com", "microsoft.com", "apple.com",
+    "nykaa.com", "ola.com", "uber.com", "makemytrip.com", "bookmyshow.com", "naukri.com",
+    "timesofindia.com", "ndtv.com", "moneycontrol.com", "zerodha.com", "groww.in",
+    "razorpay.com", "infosys.com", "wipro.com", "tcs.com", "bigbasket.com", "blinkit.com",
+    "meesho.com", "snapdeal.com", "indiamart.com", "justdial.com",
+    "policybazaar.com", "bankbazaar.com", "yesbank.in", "indusind.com", "idfcfirstbank.com",
+    "federalbank.co.in", "aubank.in", "rblbank.com", "bandhanbank.com", "lic.in",
+    "passportindia.gov.in", "digilocker.gov.in", "mygov.in", "jobs.com",
+    "weather.com", "reddit.com", "quora.com", "medium.com", "pypi.org",
+    # Share ONLINESBI's generic "online" prefix
+    "onlinesale.in", "onlineseo.com", "onlinesms.in", "onlineset.com", "onlinesql.com",
+)
+# Impersonations that must still be caught: (domain, brand name)
+LOOKALIKE_DOMAINS = (
+    ("hdfcbannk.xyz", "hdfcbank"), ("icicibnak.in", "icicibank"), ("flipkrat.com", "flipkart"),
+    ("sbl-online.com", "sbi"), ("amaz0n.in", "amazon"), ("аmazon.in", "amazon"),
+    ("xn--mazon-3ve.in", "amazon"), ("paytrn.co", "paytm"), ("airtei.in", "airtel"),
+    ("onlinesbl.com", "onlinesbi"), ("onlnesbi.com", "onlinesbi"),
+    ("bankofbarodda.in", "bankofbaroda"),
+)
+
+
+def normalize(token):
+    token = token.lower().translate(HOMOGLYPHS)
+    for pair, letter in DIGRAPHS:
+        token = token.replace(pair, letter)
+    return token
+
+
+_GENERIC_TERMS = sorted({normalize(p) for p in GENERIC_PREFIXES}, key=len, reverse=True)
+
+
+def max_distance(length):
+    """Edits allowed for a brand of this length."""
+    if length < MIN_EDIT_LENGTH:
+        return 0
+    return 1 if length < MIN_DISTANCE2_LENGTH else 2
+
+
+def _generic_prefix(term):
+    """Normalized generic prefix `term` starts with, or ""."""
+    for prefix in _GENERIC_TERMS:
+        if term.startswith(prefix) and len(term) > len(prefix):
+            return prefix
+    return ""
+
+
+def _deletes(term, distance):
+    """`term` and every string reachable from it by up to `distance` deletions."""
+    found = frontier = {term}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found = found | frontier
+    return found
+
+
+def _osa_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+def _decode_label(label):
+    if label.startswith("xn--"):
+        try:
+            return label.encode("ascii").decode("idna")
+        except UnicodeError:
+            pass
+    return label
+
+
+def domain_tokens(domain):
+    """Name tokens of a domain: hyphen parts of each label (TLD excluded) and their join."""
+    host = domain.split("@")[-1].split(":")[0]
+    labels = host.split(".")
+    if len(labels) > 1:
+        labels = labels[:-1]
+    tokens = []
+    for label in labels:
+        parts = [p for p in _decode_label(label).split("-") if p]
+        tokens += parts
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+    return [t for t in tokens if MIN_TOKEN <= len(t) <= MAX_TOKEN]
+
+
+class BrandIndex:
+    def __init__(self, brand_keywords, legit_domains=()):
+        # Exact substring rule: brand -> pack order, bucketed by length
+        self.order = {}
+        for i, brand in enumerate(brand_keywords):
+            self.order.setdefault(brand, i)
+        self.by_length = {}
+        for brand in brand_keywords:
+            self.by_length.setdefault(len(brand), set()).add(brand)
+
+        # Lookalike index over brands and legitimate domain names
+        names = list(brand_keywords)
+        names += sorted({d.split(".")[0] for d in legit_domains
+                         if len(d.split(".")[0]) >= MIN_DOMAIN_NAME} - set(names))
+        self.names = names
+        self.terms = {}       # normalized term -> index of first name with it
+        self.deletes = {}     # deletion -> {normalized term}
+        for i, name in enumerate(names):
+            term = normalize(name)
+            if term in self.terms:
+                continue
+            self.terms[term] = i
+            for variant in _deletes(term, max_distance(len(term))):
+                self.deletes.setdefault(variant, set()).add(term)
+
+    def __len__(self):
+        return len(self.names)
+
+    def exact_brand(self, domain):
+        """First brand (in pack order) contained in the domain, or None."""
+        found = set()
+        for length, brands in self.by_length.items():
+            found.update(brands.intersection(
+                [domain[start:start + length] for start in range(len(domain) - length + 1)]))
+        return min(found, key=self.order.__getitem__) if found else None
+
+    def lookalike(self, domain):
+        """
+        (brand name, domain token, distance) for the closest brand a domain
+        token imitates, or None. Distance 0 means the token equals the name
+        after homoglyph normalisation.
+        """
+        best = None
+        for token in domain_tokens(domain):
+            query = normalize(token)
+            budget = max_distance(len(query) + 2)
+            for variant in _deletes(query, budget):
+                for term in self.deletes.get(variant, ()):
+                    prefix = _generic_prefix(term)
+                    if prefix and query.startswith(prefix):
+                        # Only the distinctive rest counts, at its own length
+                        limit = max_distance(len(term) - len(prefix))
+                        distance = _osa_distance(query[len(prefix):], term[len(prefix):], limit)
+                    else:
+                        limit = max_distance(len(term))
+                        distance = _osa_distance(query, term, limit)
+                    if distance > limit:
+                        continue
+                    key = (distance, self.terms[term])
+                    if best is None or key < best[0]:
+                        best = (key, self.names[self.terms[term]], token, distance)
+        return best[1:] if best else None
+
+
+def check_domains(index, benign=BENIGN_DOMAINS, lookalikes=LOOKALIKE_DOMAINS):
+    """
+    Regression check for lookalike matching. Raises AssertionError listing
+    benign domains reported as a brand and impersonations that were missed.
+    """
+    problems = []
+    for domain in benign:
+        match = index.lookalike(domain)
+        if match:
+            problems.append(f"{domain}: benign, reported as a lookalike of {match[0]!r}")
+    for domain, expected in lookalikes:
+        match = index.lookalike(domain)
+        if index.exact_brand(domain) is None and (match is None or match[0] != expected):
+            problems.append(f"{domain}: expected lookalike of {expected!r}, got {match}")
+    if problems:
+        raise AssertionError("; ".join(problems))
+
+
+if __name__ == "__main__":
+    import rule_packs
+    pack = rule_packs.current_pack()
+    try:
+        check_domains(pack.brand_index)
+    except AssertionError as e:
+        print(f"Brand lookalike check: FAIL ({e})")
+        sys.exit(1)
+    print(f"Brand lookalike check: OK ({len(BENIGN_DOMAINS)} benign, "
+          f"{len(LOOKALIKE_DOMAINS)} lookalikes, pack {pack.version})")
@@ -0,0 +1,166 @@
+"""
+Feature 10: Scam Campaign Clustering
+Groups near-duplicate messages (same template, different names, amounts
+and links) into campaigns using MinHash signatures and an LSH index that
+lives in logs.db, so each new message is matched in sublinear time.
+"""
+import re
+import hashlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+SHINGLE_SIZE   = 5      # character n-grams over the normalized text
+NUM_PERM       = 64     # MinHash signature length
+LSH_BANDS      = 16     # 16 bands × 4 rows  →  ~0.5 Jaccard threshold
+LSH_ROWS       = NUM_PERM // LSH_BANDS
+MATCH_JACCARD  = 0.5    # estimated similarity needed to join a campaign
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1337)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+
+def init_campaign_tables(cursor):
+    """Create campaign + LSH bucket tables (called from database.init_db)."""
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id             INTEGER PRIMARY KEY AUTOINCREMENT,
+            signature      BLOB    NOT NULL,
+            size           INTEGER NOT NULL,
+            sample_message TEXT    NOT NULL,
+            first_seen     TEXT    NOT NULL,
+            last_seen      TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS campaign_lsh (
+            band        INTEGER NOT NULL,
+            bucket      INTEGER NOT NULL,
+            campaign_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket)
+        ) WITHOUT ROWID;
+    """)
+
+
+def normalize_for_clustering(message):
+    """Strip the parts scammers vary between copies of one template."""
+    text = message.lower()
+    text = re.sub(r'https?://\S+|www\.\S+', ' url ', text)
+    text = re.sub(r'[a-z0-9._%+\-]+@[a-z0-9.\-]+', ' handle ', text)
+    text = re.sub(r'\d[\d,.\s\-]*', ' 0 ', text)
+    text = re.sub(r'[^\w]+', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def minhash_signature(message):
+    """Return the MinHash signature (uint64 array) of a message."""
+    text = normalize_for_clustering(message)
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+         for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE
+    return permuted.min(axis=0)
+
+
+def _band_keys(signature):
+    """One signed 63-bit bucket key per LSH band."""
+    keys = []
+    for band in range(LSH_BANDS):
+        chunk = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'little') >> 1))
+    return keys
+
+
+def assign_campaign(cursor, message, analyzed_at):
+    """
+    Find (or start) the campaign for a message and index it in the LSH
+    buckets. Runs inside the caller's transaction. Returns the campaign id.
+    """
+    signature = minhash_signature(message)
+    keys = _band_keys(signature)
+
+    candidates = set()
+    for band, bucket in keys:
+        cursor.execute(
+            "SELECT campaign_id FROM campaign_lsh WHERE band = ? AND bucket = ?",
+            (band, bucket),
+        )
+        row = cursor.fetchone()
+        if row:
+            candidates.add(row[0])
+
+    best_id, best_sim = None, MATCH_JACCARD
+    for campaign_id in candidates:
+        cursor.execute("SELECT signature FROM campaigns WHERE id = ?", (campaign_id,))
+        row = cursor.fetchone()
+        if not row:
+            continue
+        representative = np.frombuffer(row[0], dtype=np.uint64)
+        sim = float(np.mean(representative == signature))
+        if sim >= best_sim:
+            best_id, best_sim = campaign_id, sim
+
+    if best_id is None:
+        cursor.execute("""
+            INSERT INTO campaigns (signature, size, sample_message, first_seen, last_seen)
+            VALUES (?, 1, ?, ?, ?)
+        """, (signature.tobytes(), message[:500], analyzed_at, analyzed_at))
+        best_id = cursor.lastrowid
+    else:
+        # The newest member becomes the representative, so the similarity
+        # check follows the template as it drifts instead of staying pinned
+        # to the first message
+        cursor.execute("""
+            UPDATE campaigns SET size = size + 1, last_seen = ?, signature = ? WHERE id = ?
+        """, (analyzed_at, signature.tobytes(), best_id))
+
+    # Index this variant's buckets too, so later variants find the campaign
+    cursor.executemany(
+        "INSERT OR IGNORE INTO campaign_lsh (band, bucket, campaign_id) VALUES (?, ?, ?)",
+        [(band, bucket, best_id) for band, bucket in keys],
+    )
+    return best_id
+
+
+def get_top_campaigns(cursor, days=7, limit=8, min_size=2):
+    """
+    Most active HIGH/MEDIUM campaigns over the last `days`, by hit count.
+    Uses the analyzed_at index, so cost follows the window, not the table.
+    """
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    cursor.execute("""
+        SELECT c.id, c.size, c.sample_message, c.first_seen, c.last_seen,
+               w.hits, w.max_score, w.high_hits
+        FROM (
+            SELECT campaign_id, COUNT(*) AS hits, MAX(final_score) AS max_score,
+                   SUM(risk_level = 'HIGH') AS high_hits
+            FROM analysis_logs
+            WHERE analyzed_at >= ?
+              AND campaign_id IS NOT NULL
+              AND risk_level IN ('HIGH', 'MEDIUM')
+            GROUP BY campaign_id
+            HAVING hits >= ?
+        ) w
+        JOIN campaigns c ON c.id = w.campaign_id
+        ORDER BY w.hits DESC, c.last_seen DESC
+        LIMIT ?
+    """, (since, min_size, limit))
+    return [
+        {
+            'id': row[0], 'size': row[1], 'sample': row[2],
+            'first_seen': row[3], 'last_seen': row[4],
+            'hits': row[5], 'max_score': row[6],
+            # By band: rules-tier cascade exits are logged without a score
+            'risk_level': 'HIGH' if row[7] else 'MEDIUM',
+        }
+        for row in cursor.fetchall()
+    ]
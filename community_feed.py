@@ -3,10 +3,10 @@ Feature 9: Community Scam Feed
 Anonymized HIGH-risk message feed — crowdsourced threat intelligence.
 """
 import sqlite3
-import os
 import re
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "logs.db")
+from database import DB_PATH
+import log_shards
 
 
 def anonymize_message(message):
@@ -47,16 +47,17 @@ def get_community_feed(limit=15):
     try:
         conn = sqlite3.connect(DB_PATH)
         conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, message, final_score, risk_level, flags, analyzed_at
-            FROM analysis_logs
-            WHERE risk_level IN ('HIGH', 'MEDIUM')
-            ORDER BY id DESC
-            LIMIT ?
-        """, (limit,))
-        rows = cursor.fetchall()
+        per_source = []
+        for source, where, params in log_shards.read_sources(conn):
+            per_source.append(source.execute(f"""
+                SELECT id, message, final_score, risk_level, flags, analyzed_at
+                FROM analysis_logs
+                WHERE risk_level IN ('HIGH', 'MEDIUM') AND {where}
+                ORDER BY id DESC
+                LIMIT ?
+            """, params + [limit]).fetchall())
         conn.close()
+        rows = log_shards.merge_recent(per_source, limit)
 
         feed = []
         for row in rows:
@@ -79,17 +80,17 @@ def get_top_flags(limit=10):
     """Get the most frequently detected fraud keywords across all logs."""
     try:
         conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT flags FROM analysis_logs WHERE flags != ''")
-        rows = cursor.fetchall()
-        conn.close()
-
         counter = {}
-        for (flags_str,) in rows:
-            for flag in flags_str.split(', '):
-                flag = flag.strip()
-                if flag:
-                    counter[flag] = counter.get(flag, 0) + 1
+        for source, where, params in log_shards.read_sources(conn):
+            rows = source.execute(
+                f"SELECT flags FROM analysis_logs WHERE flags != '' AND {where}", params
+            )
+            for (flags_str,) in rows:
+                for flag in flags_str.split(', '):
+                    flag = flag.strip()
+                    if flag:
+                        counter[flag] = counter.get(flag, 0) + 1
+        conn.close()
 
         sorted_flags = sorted(counter.items(), key=lambda x: x[1], reverse=True)
         return sorted_flags[:limit]
@@ -1,38 +1,217 @@
 import sqlite3
 import os
+import sys
+import html
+import re
 from datetime import datetime
 
+from campaigns import init_campaign_tables, assign_campaign, get_top_campaigns
+from rollups import init_rollup_tables, record_rollup, get_timeseries, backfill_rollups
+from result_store import init_result_tables, store_result, load_result, decode_result
+import log_shards
+
 DB_PATH = os.path.join(os.path.dirname(__file__), "logs.db")
 
 
 def init_db():
-    """Create the logs table if it doesn't exist."""
+    """
+    Create the logs table if it doesn't exist. An existing database must
+    be at SCHEMA_VERSION; older ones are upgraded by migrate(), which is
+    run explicitly (python database.py --migrate), never on startup.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    fresh = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_logs'"
+    ).fetchone() is None
+    if not fresh:
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            conn.close()
+            raise RuntimeError(f"{DB_PATH} is at schema version {version}, this code needs "
+                               f"{SCHEMA_VERSION}: run `python database.py --migrate`")
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS analysis_logs (
             id          INTEGER PRIMARY KEY AUTOINCREMENT,
             message     TEXT    NOT NULL,
             rule_score  INTEGER NOT NULL,
-            ai_score    INTEGER NOT NULL,
-            final_score INTEGER NOT NULL,
+            ai_score    INTEGER,
+            final_score INTEGER,
             risk_level  TEXT    NOT NULL,
             flags       TEXT    NOT NULL,
-            analyzed_at TEXT    NOT NULL
+            analyzed_at TEXT    NOT NULL,
+            campaign_id INTEGER,
+            rule_pack_version TEXT
         )
     """)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(analysis_logs)")}
+    if "campaign_id" not in columns:
+        cursor.execute("ALTER TABLE analysis_logs ADD COLUMN campaign_id INTEGER")
+    if "rule_pack_version" not in columns:
+        cursor.execute("ALTER TABLE analysis_logs ADD COLUMN rule_pack_version TEXT")
+    if fresh:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    init_campaign_tables(cursor)
+    init_rollup_tables(cursor)
+    init_result_tables(cursor)
+    log_shards.init_shard_tables(cursor)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_logs_analyzed_at
+        ON analysis_logs (analyzed_at)
+    """)
+
+    # Full-text index over message + flags, kept in sync by triggers.
+    # External-content table: the text lives only in analysis_logs.
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_logs_fts'"
+    )
+    fts_exists = cursor.fetchone() is not None
+    cursor.executescript("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS analysis_logs_fts USING fts5(
+            message,
+            flags,
+            content = 'analysis_logs',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS analysis_logs_fts_ai AFTER INSERT ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (rowid, message, flags)
+            VALUES (new.id, new.message, new.flags);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS analysis_logs_fts_ad AFTER DELETE ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (analysis_logs_fts, rowid, message, flags)
+            VALUES ('delete', old.id, old.message, old.flags);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS analysis_logs_fts_au AFTER UPDATE OF message, flags ON analysis_logs BEGIN
+            INSERT INTO analysis_logs_fts (analysis_logs_fts, rowid, message, flags)
+            VALUES ('delete', old.id, old.message, old.flags);
+            INSERT INTO analysis_logs_fts (rowid, message, flags)
+            VALUES (new.id, new.message, new.flags);
+        END;
+    """)
+    if not fts_exists:
+        # One-time backfill of rows logged before the index existed
+        cursor.execute("INSERT INTO analysis_logs_fts (analysis_logs_fts) VALUES ('rebuild')")
     conn.commit()
     conn.close()
 
 
-def log_analysis(message, rule_score, ai_score, final_score, risk_level, detected_phrases):
-    """Insert one analysis record into the database."""
+def _nullable_scores(cursor):
+    """
+    Migration 1: ai_score and final_score become nullable. A cascade
+    decided by the rules alone never runs the model, so it has neither.
+    SQLite cannot drop NOT NULL in place, so the table is copied with its
+    ids, which keeps the external-content search index, retained results
+    and the AUTOINCREMENT sequence (main-store ids stay below the shard
+    id ranges) lined up; its indexes and triggers are recreated as they were.
+    """
+    create_sql, = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'analysis_logs'"
+    ).fetchone()
+    for column in ("ai_score", "final_score"):
+        create_sql = re.sub(rf"\b{column}(\s+)INTEGER NOT NULL", rf"{column}\1INTEGER", create_sql)
+    dependents = [sql for sql, in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'analysis_logs' "
+        "AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )]
+    columns = ", ".join(row[1] for row in cursor.execute("PRAGMA table_info(analysis_logs)"))
+    count, max_id = cursor.execute("SELECT COUNT(*), MAX(id) FROM analysis_logs").fetchone()
+    seq = cursor.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'analysis_logs'"
+    ).fetchone()[0]
+
+    cursor.execute(create_sql.replace("analysis_logs", "analysis_logs_rebuild", 1))
+    cursor.execute(f"INSERT INTO analysis_logs_rebuild ({columns}) "
+                   f"SELECT {columns} FROM analysis_logs")
+    cursor.execute("DROP TABLE analysis_logs")
+    cursor.execute("ALTER TABLE analysis_logs_rebuild RENAME TO analysis_logs")
+    # The copy only advances the sequence to MAX(id); restore the old high-water mark
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'analysis_logs'")
+    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('analysis_logs', ?)",
+                   (max(seq, max_id or 0),))
+    for sql in dependents:
+        cursor.execute(sql)
+
+    if cursor.execute("SELECT COUNT(*), MAX(id) FROM analysis_logs").fetchone() != (count, max_id):
+        raise RuntimeError("analysis_logs rebuild lost or renumbered rows")
+    if max_id is not None and max_id >= log_shards.SHARD_ID_BASE:
+        raise RuntimeError("main-store log ids reach into the shard id range")
+    if cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analysis_logs_fts'"
+    ).fetchone():
+        # Fails (sqlite3.DatabaseError) if the index no longer matches the rows
+        cursor.execute("INSERT INTO analysis_logs_fts (analysis_logs_fts) VALUES ('integrity-check')")
+
+
+SCHEMA_VERSION = 1
+MIGRATIONS = {1: _nullable_scores}   # version -> step that upgrades to it
+
+
+def migrate():
+    """
+    Bring an existing database up to SCHEMA_VERSION, one step at a time,
+    each in its own transaction. Safe to run again or from several
+    processes: the version is re-read under the write lock. Returns the
+    versions applied.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=60, isolation_level=None)
+    cursor = conn.cursor()
+    applied = []
+    try:
+        for version in sorted(MIGRATIONS):
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if cursor.execute("PRAGMA user_version").fetchone()[0] < version:
+                    MIGRATIONS[version](cursor)
+                    cursor.execute(f"PRAGMA user_version = {version}")
+                    applied.append(version)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+    return applied
+
+
+def rebuild_search_index():
+    """Rebuild the full-text index from analysis_logs (backfill / repair)."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO analysis_logs_fts (analysis_logs_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO analysis_logs_fts (analysis_logs_fts) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+
+
+def log_analysis(message, rule_score, ai_score, final_score, risk_level, detected_phrases,
+                 rule_pack_version=None, result=None):
+    """
+    Insert one analysis record into the database. Returns the new log id.
+    The full result dict, if given, is retained under the same id.
+    In sharded mode the row goes to this worker's shard; campaign and
+    rollup bookkeeping then happens when the shard is compacted.
+    """
+    now = datetime.now()
+    analyzed_at = now.strftime("%Y-%m-%d %H:%M:%S")
+    message = message.translate(_HL_STRIP)   # keep search highlight markers unambiguous
+    if log_shards.ENABLED:
+        return log_shards.write_log(DB_PATH, (
+            message, rule_score, ai_score, final_score, risk_level,
+            ", ".join(detected_phrases), analyzed_at, rule_pack_version,
+        ), result)
+
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    campaign_id = assign_campaign(cursor, message, analyzed_at)
+    record_rollup(cursor, now.replace(microsecond=0), risk_level, final_score, detected_phrases)
     cursor.execute("""
         INSERT INTO analysis_logs
-            (message, rule_score, ai_score, final_score, risk_level, flags, analyzed_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+            (message, rule_score, ai_score, final_score, risk_level, flags, analyzed_at,
+             campaign_id, rule_pack_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         message,
         rule_score,
@@ -40,51 +219,271 @@ def log_analysis(message, rule_score, ai_score, final_score, risk_level, detecte
         final_score,
         risk_level,
         ", ".join(detected_phrases),
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        analyzed_at,
+        campaign_id,
+        rule_pack_version
     ))
+    log_id = cursor.lastrowid
+    if result is not None:
+        store_result(cursor, log_id, result)
     conn.commit()
     conn.close()
+    return log_id
 
 
-def get_recent_logs(limit=10):
-    """Fetch the most recent analysis records."""
+def get_result(log_id):
+    """The retained full_analysis result for a log id, or None."""
+    conn = sqlite3.connect(DB_PATH)
+    if log_shards.shard_of(log_id) is None:
+        result = load_result(conn.cursor(), log_id)
+    else:
+        payload = log_shards.find_result_payload(conn, log_id)
+        result = decode_result(payload) if payload else None
+    conn.close()
+    return result
+
+
+def backfill_campaigns(batch_size=1000):
+    """Assign campaigns to rows logged before clustering existed, oldest first."""
     conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM analysis_logs
-        ORDER BY id DESC
-        LIMIT ?
-    """, (limit,))
-    rows = [dict(row) for row in cursor.fetchall()]
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, message, analyzed_at FROM analysis_logs
+            WHERE id > ? AND campaign_id IS NULL
+            ORDER BY id LIMIT ?
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for log_id, message, analyzed_at in rows:
+            campaign_id = assign_campaign(cursor, message, analyzed_at)
+            cursor.execute(
+                "UPDATE analysis_logs SET campaign_id = ? WHERE id = ?", (campaign_id, log_id)
+            )
+        last_id = rows[-1][0]
+        conn.commit()
     conn.close()
-    return rows
 
 
-def get_stats():
-    """Return aggregate statistics across all logs."""
+def rebuild_rollups():
+    """Recompute the per-minute / per-hour trend rollups from all logs."""
+    conn = sqlite3.connect(DB_PATH)
+    backfill_rollups(conn.cursor())
+    conn.commit()
+    conn.close()
+
+
+def get_stats_timeseries(window, bucket, include_flags=False):
+    """Trend buckets for the dashboard (see rollups.get_timeseries)."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return get_timeseries(conn.cursor(), window, bucket, include_flags=include_flags)
+    finally:
+        conn.close()
+
+
+def get_active_campaigns(days=7, limit=8):
+    """Top active scam campaigns for the dashboard."""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM analysis_logs")
-    total = cursor.fetchone()[0]
+    campaigns = get_top_campaigns(cursor, days=days, limit=limit)
+    conn.close()
+    return campaigns
+
+
+def get_data_version():
+    """
+    Change token for everything read from analysis_logs: the last log id.
+    Rows are only ever appended, and campaign/rollup updates happen in the
+    same transaction as the insert, so a new id covers them too.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    last_id = conn.execute("SELECT MAX(id) FROM analysis_logs").fetchone()[0] or 0
+    shard_seqs = log_shards.shard_sequences(conn)
+    conn.close()
+    if shard_seqs:
+        return "-".join(str(v) for v in [last_id] + shard_seqs)
+    return last_id
+
+
+def get_recent_logs(limit=10):
+    """Fetch the most recent analysis records (merged across log shards)."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    per_source = []
+    for source, where, params in log_shards.read_sources(conn):
+        rows = source.execute(f"""
+            SELECT {", ".join(log_shards.LOG_COLUMNS)} FROM analysis_logs
+            WHERE {where}
+            ORDER BY id DESC
+            LIMIT ?
+        """, params + [limit]).fetchall()
+        per_source.append([dict(row) for row in rows])
+    conn.close()
+    return log_shards.merge_recent(per_source, limit)
+
 
-    cursor.execute("SELECT COUNT(*) FROM analysis_logs WHERE risk_level = 'HIGH'")
-    high = cursor.fetchone()[0]
+def get_last_log_id():
+    """Highest id in the main log table (0 when empty)."""
+    conn = sqlite3.connect(DB_PATH)
+    last_id = conn.execute("SELECT MAX(id) FROM analysis_logs").fetchone()[0] or 0
+    conn.close()
+    return last_id
 
-    cursor.execute("SELECT COUNT(*) FROM analysis_logs WHERE risk_level = 'MEDIUM'")
-    medium = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM analysis_logs WHERE risk_level = 'LOW'")
-    low = cursor.fetchone()[0]
+def iter_messages_since(analyzed_at, until_id=None, batch_size=1000):
+    """
+    Yield (message, analyzed_at) logged at or after `analyzed_at`, oldest
+    first, stopping at `until_id` when given.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    last_id = (conn.execute(
+        "SELECT MIN(id) FROM analysis_logs WHERE analyzed_at >= ?", (analyzed_at,)
+    ).fetchone()[0] or 2 ** 62) - 1
+    until_id = 2 ** 62 if until_id is None else until_id
+    while True:
+        rows = conn.execute("""
+            SELECT id, message, analyzed_at FROM analysis_logs
+            WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+        """, (last_id, until_id, batch_size)).fetchall()
+        if not rows:
+            break
+        for _, message, at in rows:
+            yield message, at
+        last_id = rows[-1][0]
+    conn.close()
 
-    cursor.execute("SELECT ROUND(AVG(final_score), 1) FROM analysis_logs")
-    avg_score = cursor.fetchone()[0] or 0
 
+def get_stats():
+    """Return aggregate statistics across all logs (summed across log shards)."""
+    conn = sqlite3.connect(DB_PATH)
+    total = high = medium = low = score_sum = scored = 0
+    for source, where, params in log_shards.read_sources(conn):
+        row = source.execute(f"""
+            SELECT COUNT(*),
+                   COALESCE(SUM(risk_level = 'HIGH'), 0),
+                   COALESCE(SUM(risk_level = 'MEDIUM'), 0),
+                   COALESCE(SUM(risk_level = 'LOW'), 0),
+                   COALESCE(SUM(final_score), 0),
+                   COUNT(final_score)
+            FROM analysis_logs WHERE {where}
+        """, params).fetchone()
+        total += row[0]
+        high += row[1]
+        medium += row[2]
+        low += row[3]
+        score_sum += row[4]
+        scored += row[5]
     conn.close()
     return {
         "total": total,
         "high": high,
         "medium": medium,
         "low": low,
-        "avg_score": avg_score
+        # Rules-tier cascade exits carry no score; average over the scored ones
+        "avg_score": round(score_sum / scored, 1) if scored else 0
     }
+
+
+# Control characters swapped for <mark> tags after the snippet has been
+# HTML-escaped. log_analysis() strips them from incoming messages; _mark()
+# still pairs them itself, so rows logged before that stay balanced.
+_HL_OPEN, _HL_CLOSE = "\x02", "\x03"
+_HL_STRIP = str.maketrans({_HL_OPEN: " ", _HL_CLOSE: " "})
+
+
+def _mark(text):
+    out, open_ = [], False
+    for part in re.split(f"([{_HL_OPEN}{_HL_CLOSE}])", text or ""):
+        if part == _HL_OPEN:
+            if not open_:
+                out.append('<mark class="hl">')
+                open_ = True
+        elif part == _HL_CLOSE:
+            if open_:
+                out.append("</mark>")
+                open_ = False
+        else:
+            out.append(html.escape(part))
+    if open_:
+        out.append("</mark>")
+    return "".join(out)
+
+
+def _fts_phrase(query):
+    """Turn free user input into a single FTS5 phrase (no query syntax)."""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def search_logs(query, risk_level=None, date_from=None, date_to=None,
+                limit=20, offset=0, order="rank"):
+    """
+    Full-text search over logged messages and flags.
+    Dates are 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' strings (inclusive).
+    Returns a list of dicts with a highlighted snippet, best match first
+    (order="rank") or newest first (order="recent").
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    where = ["analysis_logs_fts MATCH ?"]
+    params = [_fts_phrase(query)]
+
+    # Ids grow with time, so a date range becomes a rowid range that
+    # FTS5 can apply inside the index instead of filtering every hit. Rows
+    # folded in from log shards can be slightly out of order, so the exact
+    # timestamp check is kept as well.
+    if date_from:
+        cursor.execute(
+            "SELECT MIN(id) FROM analysis_logs WHERE analyzed_at >= ?", (date_from,)
+        )
+        where.append("f.rowid >= ? AND l.analyzed_at >= ?")
+        params += [cursor.fetchone()[0] or 2 ** 62, date_from]
+    if date_to:
+        if len(date_to) == 10:
+            date_to += " 23:59:59"
+        cursor.execute(
+            "SELECT MAX(id) FROM analysis_logs WHERE analyzed_at <= ?", (date_to,)
+        )
+        where.append("f.rowid <= ? AND l.analyzed_at <= ?")
+        params += [cursor.fetchone()[0] or 0, date_to]
+    if risk_level:
+        where.append("l.risk_level = ?")
+        params.append(risk_level)
+
+    order_by = "f.rowid DESC" if order == "recent" else "f.rank"
+    cursor.execute(f"""
+        SELECT l.id, l.final_score, l.risk_level, l.flags, l.analyzed_at,
+               snippet(analysis_logs_fts, 0, ?, ?, '…', 16) AS snippet,
+               highlight(analysis_logs_fts, 1, ?, ?) AS flags_highlighted,
+               bm25(analysis_logs_fts) AS score
+        FROM analysis_logs_fts f
+        JOIN analysis_logs l ON l.id = f.rowid
+        WHERE {" AND ".join(where)}
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    """, [_HL_OPEN, _HL_CLOSE, _HL_OPEN, _HL_CLOSE] + params + [limit, offset])
+    rows = []
+    for row in cursor.fetchall():
+        row = dict(row)
+        row["snippet"] = _mark(row["snippet"])
+        row["flags_highlighted"] = _mark(row["flags_highlighted"])
+        rows.append(row)
+    conn.close()
+    return rows
+
+
+if __name__ == "__main__":
+    if "--migrate" in sys.argv[1:]:
+        print(f"Applied migrations: {migrate() or 'none'}")
+    init_db()
+    rebuild_search_index()
+    print("Search index rebuilt.")
+    print(f"Folded {log_shards.compact(DB_PATH)} rows from log shards.")
+    backfill_campaigns()
+    print("Campaign ids backfilled.")
+    rebuild_rollups()
+    print("Trend rollups rebuilt.")
@@ -7,62 +7,97 @@ import re
 import numpy as np
 
 
-def get_top_features(message, pipeline, top_n=10):
+_names_cache = (None, None)   # (vectorizer, its feature names)
+
+
+def _feature_names(vectorizer):
+    # get_feature_names_out() rebuilds the array on every call
+    global _names_cache
+    cached_for, names = _names_cache
+    if cached_for is not vectorizer:
+        names = vectorizer.get_feature_names_out()
+        _names_cache = (vectorizer, names)
+    return names
+
+
+def get_top_features_batch(messages, pipeline, top_n=10):
     """
-    Extract the top contributing words/phrases to the AI fraud score.
-    Returns list of (word, contribution_score, direction) tuples.
+    get_top_features() for several messages with one vectorizer call,
+    which costs about the same as vectorizing a single message.
     """
     try:
         vectorizer = pipeline.named_steps['tfidf']
         classifier = pipeline.named_steps['clf']
 
-        # Vectorize the input message
-        X = vectorizer.transform([message.lower()])
+        # Vectorize all messages at once (rows of a CSR matrix)
+        X = vectorizer.transform([message.lower() for message in messages])
 
         # Get feature names and coefficients for fraud class (class 1)
-        feature_names = vectorizer.get_feature_names_out()
+        feature_names = _feature_names(vectorizer)
         coefs = classifier.coef_[0]  # coefficients for fraud class
+    except Exception:
+        return [[] for _ in messages]
+
+    return [
+        _top_contributions(feature_names, coefs,
+                           X.indices[X.indptr[row]:X.indptr[row + 1]],
+                           X.data[X.indptr[row]:X.indptr[row + 1]], top_n)
+        for row in range(len(messages))
+    ]
 
-        # Get non-zero feature indices for this message
-        non_zero = X.nonzero()[1]
 
-        contributions = []
-        for idx in non_zero:
+def _top_contributions(feature_names, coefs, indices, values, top_n):
+    contributions = []
+    for idx, tfidf_val in zip(indices, values):
+        if tfidf_val:
             word = feature_names[idx]
-            tfidf_val = X[0, idx]
             contribution = float(coefs[idx] * tfidf_val)
             contributions.append((word, contribution))
 
-        # Sort by absolute contribution
-        contributions.sort(key=lambda x: abs(x[1]), reverse=True)
-        top = contributions[:top_n]
-
-        # Normalize to 0-100 scale for display
-        if top:
-            max_abs = max(abs(c) for _, c in top) or 1
-            result = []
-            for word, contrib in top:
-                normalized = round(abs(contrib) / max_abs * 100)
-                direction = 'fraud' if contrib > 0 else 'safe'
-                result.append({
-                    'word': word,
-                    'score': normalized,
-                    'raw': round(contrib, 4),
-                    'direction': direction
-                })
-            return result
-
-        return []
+    # Sort by absolute contribution
+    contributions.sort(key=lambda x: abs(x[1]), reverse=True)
+    top = contributions[:top_n]
 
-    except Exception:
-        return []
+    # Normalize to 0-100 scale for display
+    if top:
+        max_abs = max(abs(c) for _, c in top) or 1
+        result = []
+        for word, contrib in top:
+            normalized = round(abs(contrib) / max_abs * 100)
+            direction = 'fraud' if contrib > 0 else 'safe'
+            result.append({
+                'word': word,
+                'score': normalized,
+                'raw': round(contrib, 4),
+                'direction': direction
+            })
+        return result
+
+    return []
+
+
+def get_top_features(message, pipeline, top_n=10):
+    """
+    Extract the top contributing words/phrases to the AI fraud score.
+    Returns list of (word, contribution_score, direction) tuples.
+    """
+    return get_top_features_batch([message], pipeline, top_n)[0]
 
 
 def get_ai_explanation(message, pipeline):
     """
     Returns a structured explanation of why the AI gave the score it did.
     """
-    features = get_top_features(message, pipeline)
+    return explain_features(get_top_features(message, pipeline))
+
+
+def get_ai_explanations(messages, pipeline):
+    """get_ai_explanation() for a batch of messages (one vectorizer call)."""
+    return [explain_features(f) for f in get_top_features_batch(messages, pipeline)]
+
+
+def explain_features(features):
+    """Structured explanation from get_top_features() output."""
     fraud_features = [f for f in features if f['direction'] == 'fraud']
     safe_features  = [f for f in features if f['direction'] == 'safe']
 
@@ -0,0 +1,62 @@
+"""
+Shared cache for the expensive parts of the read-only pages.
+The recent-logs table, flag panels and feed cards (and the queries behind
+them) are built once per data version and reused by every viewer until a
+new analysis is logged. The version is the same token the pages use for
+their ETags, so other workers' writes are picked up too; this worker's own
+writes also drop the cache straight away. Concurrent misses for the same
+fragment wait for one build instead of each rendering it.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class FragmentCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (version, value)
+        self._pending = {}   # (key, version) -> Future
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def get(self, key, version, build):
+        """Cached value of build() for `key` at `version`, building it at most once."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            future = self._pending.get((key, version))
+            builder = future is None
+            if builder:
+                future = self._pending[(key, version)] = Future()
+                self.misses += 1
+            else:
+                self.shared += 1
+        if not builder:
+            return future.result()
+
+        try:
+            value = build()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            with self._lock:
+                self._entries[key] = (version, value)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop((key, version), None)
+
+    def invalidate(self):
+        """Drop everything (called after this worker logs an analysis)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "shared_builds": self.shared}
@@ -0,0 +1,57 @@
+"""
+Conditional GET for the read-only pages and stats API.
+Each cached view gets a cheap version token (last log id, active rule pack,
+model and template fingerprints). The token is sent as a weak ETag; when
+the client's If-None-Match still matches, the view is skipped entirely and
+a 304 goes back without running any of its queries.
+"""
+import os
+import hashlib
+from functools import wraps
+
+from flask import request, make_response, Response
+
+# Pages/APIs with no per-user content may sit in shared caches briefly;
+# the rest must revalidate every time (which is a cheap 304).
+SHARED_SHORT = "public, max-age=5"
+REVALIDATE   = "no-cache"
+
+
+def build_fingerprint(*parts, template_dir=None):
+    """Hash of static inputs to rendered output (templates, model, ...)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+    if template_dir:
+        for name in sorted(os.listdir(template_dir)):
+            with open(os.path.join(template_dir, name), "rb") as f:
+                digest.update(name.encode("utf-8"))
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def conditional_get(version, cache_control=REVALIDATE):
+    """
+    Route decorator: `version()` returns the current content token for the
+    view. GET/HEAD requests whose If-None-Match matches get a bare 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            # Taken before the view runs: a write landing mid-render only
+            # makes the token older than the body, which is safe.
+            etag = version()
+            if request.if_none_match.contains_weak(etag):
+                resp = Response(status=304)
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(etag, weak=True)
+            resp.headers["Cache-Control"] = cache_control
+            return resp
+        return wrapper
+    return decorator
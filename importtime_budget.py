@@ -0,0 +1,82 @@
+"""
+Startup-time budget check for the web app.
+Runs `python -X importtime -c "import app"` in a fresh interpreter and
+fails (exit 1) when the cumulative import time of `app` exceeds the
+budget, or when a lazily-loaded heavy subsystem is imported at startup.
+
+    python importtime_budget.py                 # default budget
+    python importtime_budget.py --budget-ms 400 --runs 5
+
+Run it in CI next to the other checks; the best of several runs is used
+so one noisy run doesn't fail the build.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+DEFAULT_BUDGET_MS = 600
+
+# Must stay behind the subsystems facade / nlp_model.get_pipeline
+FORBIDDEN_AT_STARTUP = [
+    'sklearn', 'scipy', 'pytesseract', 'PIL', 'reportlab', 'pyarrow',
+]
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$')
+
+
+def measure(module='app'):
+    """Return (cumulative_ms of module, {imported_name: cumulative_ms})."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=here, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{proc.stderr[-2000:]}')
+
+    imported = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            imported[m.group(4)] = int(m.group(2)) / 1000
+    return imported.get(module, 0.0), imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if `import app` exceeds its time budget.')
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('FRAUDSHIELD_IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    best, imported = None, {}
+    for _ in range(max(1, args.runs)):
+        total, names = measure('app')
+        if best is None or total < best:
+            best, imported = total, names
+
+    failures = []
+    leaked = sorted({name.split('.')[0] for name in imported}
+                    & set(FORBIDDEN_AT_STARTUP))
+    if leaked:
+        failures.append(f'heavy modules imported at startup: {", ".join(leaked)}')
+    if best > args.budget_ms:
+        failures.append(f'import app took {best:.0f} ms (budget {args.budget_ms:.0f} ms)')
+
+    top = sorted(((ms, name) for name, ms in imported.items() if '.' not in name and name != 'app'),
+                 reverse=True)[:8]
+    print(f'import app: {best:.0f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})')
+    for ms, name in top:
+        print(f'  {ms:8.1f} ms  {name}')
+
+    if failures:
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
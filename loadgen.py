@@ -0,0 +1,479 @@
+"""
+Traffic replay load generator.
+Replays a message mix against a running FraudShield instance and reports
+p50/p95/p99/p99.9 latency, error rate and throughput per route.
+
+The default mode is open-loop: request i is *scheduled* at t0 + i/rate
+(uniform or Poisson arrivals) and its latency is measured from that
+scheduled time, not from when a worker thread got around to sending it.
+A slow server therefore shows up as queueing delay in the percentiles
+instead of silently lowering the offered load (coordinated omission).
+--concurrency runs a closed loop instead, for saturation/throughput tests.
+
+Message sources:
+    logs               messages from analysis_logs (read-only)
+    jsonl:PATH         one JSON object per line with "message", "text" or "body"
+    synthetic          TRAINING_DATA variants with randomized numbers and links
+
+Route mix (weights): analyze (POST /), screenshot (POST / with a PNG),
+report (GET /report/<token>.pdf), stats (GET /api/stats), dashboard, logs,
+community, search (GET /api/logs/search).
+
+    python loadgen.py --rate 50 --duration 60
+    python loadgen.py --source logs --rate 200 --mix analyze=85,screenshot=5,report=5,stats=5
+    python loadgen.py --concurrency 16 --duration 30 --out loadgen_results/
+    python loadgen.py --compare loadgen_results/old.json loadgen_results/new.json
+
+Each run is saved as JSON under --out so runs can be diffed between releases.
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MIX = "analyze=80,screenshot=3,report=3,stats=6,dashboard=4,search=4"
+PERCENTILES = [50, 95, 99, 99.9]
+RESULTS_DIR = "loadgen_results"
+
+
+# ── MESSAGE SOURCES ──────────────────────────────────────
+
+def messages_from_logs(limit=5000):
+    from database import DB_PATH
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    rows = conn.execute(
+        "SELECT message FROM analysis_logs ORDER BY id DESC LIMIT ?", (limit,)
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows if r[0]]
+
+
+def messages_from_jsonl(path):
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                messages.append(item)
+            else:
+                text = item.get("message") or item.get("text") or item.get("body")
+                if text:
+                    messages.append(text)
+    return messages
+
+
+def synthetic_messages(n=500, seed=0):
+    from nlp_model import TRAINING_DATA
+    rng = random.Random(seed)
+    base = [msg for msg, _ in TRAINING_DATA]
+    links = ["http://sbi-kyc-update.xyz/verify", "https://bit.ly/3xYz",
+             "https://amazon.in/orders/123", "http://paytm-reward.top/claim"]
+    messages = []
+    for _ in range(n):
+        msg = rng.choice(base)
+        if rng.random() < 0.3:
+            msg += f" Ref {rng.randint(100000, 999999)}."
+        if rng.random() < 0.3:
+            msg += " " + rng.choice(links)
+        if rng.random() < 0.05:
+            msg = " ".join([msg] * rng.randint(20, 60))   # long-input path
+        messages.append(msg)
+    return messages
+
+
+def load_messages(source):
+    if source == "logs":
+        messages = messages_from_logs()
+    elif source == "synthetic":
+        messages = synthetic_messages()
+    elif source.startswith("jsonl:"):
+        messages = messages_from_jsonl(source[len("jsonl:"):])
+    else:
+        raise SystemExit(f"Unknown source {source!r} (logs, synthetic, jsonl:PATH)")
+    if not messages:
+        raise SystemExit(f"Source {source!r} yielded no messages.")
+    return messages
+
+
+def render_screenshot(text):
+    """PNG of `text` as black-on-white lines, for the OCR upload path."""
+    from PIL import Image, ImageDraw
+    lines = [text[i:i + 60] for i in range(0, min(len(text), 600), 60)] or [" "]
+    img = Image.new("RGB", (640, 24 * len(lines) + 20), "white")
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((10, 10 + 24 * i), line, fill="black")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# ── REQUEST BUILDERS ─────────────────────────────────────
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n'.encode())
+    for name, (filename, data, ctype) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{filename}"\r\nContent-Type: {ctype}\r\n\r\n'.encode()
+                     + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _form(fields):
+    return urllib.parse.urlencode(fields).encode(), "application/x-www-form-urlencoded"
+
+
+class Workload:
+    """Turns a route name + random message into a (method, path, body, content_type)."""
+
+    def __init__(self, messages, seed=0, screenshots=8, base_url=None, reports=8, timeout=30.0):
+        self.messages = messages
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._screenshots = None
+        self._screenshot_count = screenshots
+        self.base_url = base_url
+        self.timeout = timeout
+        self._report_tokens = None
+        self._report_count = reports
+
+    def _message(self):
+        with self._lock:
+            return self.rng.choice(self.messages)
+
+    def screenshots(self):
+        if self._screenshots is None:
+            self._screenshots = [render_screenshot(self._message())
+                                 for _ in range(self._screenshot_count)]
+        return self._screenshots
+
+    def report_tokens(self):
+        """
+        Report tokens minted once on the target by analysing a few messages
+        (the server only renders reports of results it retained itself).
+        """
+        if self._report_tokens is None:
+            if not self.base_url:
+                raise ValueError("the report route needs base_url to mint report tokens")
+            tokens = []
+            for _ in range(self._report_count):
+                body = json.dumps({"message": self._message(), "fields": ["report_token"]})
+                req = urllib.request.Request(self.base_url + "/api/analyze", data=body.encode(),
+                                             method="POST")
+                req.add_header("Content-Type", "application/json")
+                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                    token = json.load(resp).get("report_token")
+                if token:
+                    tokens.append(token)
+            if not tokens:
+                raise SystemExit("Target returned no report tokens (result retention disabled?).")
+            self._report_tokens = tokens
+        return self._report_tokens
+
+    def build(self, route):
+        msg = self._message()
+        if route == "analyze":
+            return ("POST", "/", *_form({"message": msg}))
+        if route == "screenshot":
+            shots = self.screenshots()
+            with self._lock:
+                png = self.rng.choice(shots)
+            return ("POST", "/", *_multipart({}, {"screenshot": ("shot.png", png, "image/png")}))
+        if route == "report":
+            tokens = self.report_tokens()
+            with self._lock:
+                token = self.rng.choice(tokens)
+            return ("GET", f"/report/{token}.pdf", None, None)
+        if route == "search":
+            word = msg.split()[0] if msg.split() else "otp"
+            return ("GET", "/api/logs/search?" + urllib.parse.urlencode({"q": word}), None, None)
+        paths = {"stats": "/api/stats", "dashboard": "/dashboard",
+                 "logs": "/logs", "community": "/community"}
+        if route in paths:
+            return ("GET", paths[route], None, None)
+        raise ValueError(f"Unknown route {route!r}")
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ── EXECUTION ────────────────────────────────────────────
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}   # route -> list of latency ms
+        self.errors = {}    # route -> {error kind: count}
+
+    def add(self, route, latency_ms, error=None):
+        with self._lock:
+            self.samples.setdefault(route, []).append(latency_ms)
+            if error:
+                kinds = self.errors.setdefault(route, {})
+                kinds[error] = kinds.get(error, 0) + 1
+
+
+def send(base_url, request_spec, timeout):
+    """Perform one request. Returns an error kind, or None on 2xx/3xx."""
+    method, path, body, ctype = request_spec
+    req = urllib.request.Request(base_url + path, data=body, method=method)
+    if ctype:
+        req.add_header("Content-Type", ctype)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+        return None
+    except urllib.error.HTTPError as e:
+        e.read()
+        return f"http_{e.code}"
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, "reason", e)
+        return f"conn_{type(reason).__name__}"
+
+
+def run_open_loop(base_url, workload, mix, rate, duration, arrivals, timeout,
+                  max_workers, seed):
+    """Schedule arrivals independently of completions; latency from scheduled time."""
+    rng = random.Random(seed)
+    routes, weights = zip(*mix.items())
+    recorder = Recorder()
+    max_lag = 0.0
+
+    def task(route, spec, scheduled):
+        error = send(base_url, spec, timeout)
+        recorder.add(route, (time.perf_counter() - scheduled) * 1000, error)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        t0 = time.perf_counter() + 0.1
+        next_at = t0
+        while next_at < t0 + duration:
+            route = rng.choices(routes, weights)[0]
+            spec = workload.build(route)
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            max_lag = max(max_lag, time.perf_counter() - next_at)
+            pool.submit(task, route, spec, next_at)
+            gap = rng.expovariate(rate) if arrivals == "poisson" else 1.0 / rate
+            next_at += gap
+    elapsed = time.perf_counter() - t0
+    return recorder, elapsed, max_lag * 1000
+
+
+def run_closed_loop(base_url, workload, mix, concurrency, duration, timeout, seed):
+    """N workers, each sending its next request when the previous one finishes."""
+    routes, weights = zip(*mix.items())
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def worker(i):
+        rng = random.Random(seed + i)
+        while time.perf_counter() < deadline:
+            route = rng.choices(routes, weights)[0]
+            spec = workload.build(route)
+            start = time.perf_counter()
+            error = send(base_url, spec, timeout)
+            recorder.add(route, (time.perf_counter() - start) * 1000, error)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.perf_counter() - t0, 0.0
+
+
+# ── REPORTING ────────────────────────────────────────────
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already-sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples, errors, elapsed):
+    values = sorted(samples)
+    n = len(values)
+    n_errors = sum(errors.values())
+    summary = {
+        "count":          n,
+        "errors":         n_errors,
+        "error_rate":     round(n_errors / n, 4) if n else 0.0,
+        "error_kinds":    errors,
+        "throughput_rps": round(n / elapsed, 2) if elapsed else 0.0,
+        "mean_ms":        round(sum(values) / n, 2) if n else None,
+        "max_ms":         round(values[-1], 2) if n else None,
+    }
+    for p in PERCENTILES:
+        v = percentile(values, p)
+        summary[f"p{p:g}_ms"] = round(v, 2) if v is not None else None
+    return summary
+
+
+def build_report(recorder, elapsed, meta):
+    routes = {
+        route: summarize(samples, recorder.errors.get(route, {}), elapsed)
+        for route, samples in sorted(recorder.samples.items())
+    }
+    all_samples = [v for samples in recorder.samples.values() for v in samples]
+    all_errors = {}
+    for kinds in recorder.errors.values():
+        for kind, count in kinds.items():
+            all_errors[kind] = all_errors.get(kind, 0) + count
+    meta = dict(meta, elapsed_s=round(elapsed, 2))
+    return {"meta": meta, "overall": summarize(all_samples, all_errors, elapsed), "routes": routes}
+
+
+def _fmt(v):
+    return "-" if v is None else f"{v:.1f}"
+
+
+def print_report(report):
+    meta = report["meta"]
+    print(f"\n{meta['mode']} · {meta['base_url']} · {meta['elapsed_s']}s · source {meta['source']}")
+    if meta.get("max_dispatch_lag_ms", 0) > 50:
+        print(f"WARNING: generator fell {meta['max_dispatch_lag_ms']:.0f} ms behind schedule; "
+              "results are a lower bound")
+    header = (f"{'route':<12}{'count':>8}{'err%':>7}{'rps':>8}"
+              + "".join(f"{'p' + format(p, 'g'):>9}" for p in PERCENTILES) + f"{'max':>9}")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["routes"].items()) + [("ALL", report["overall"])]
+    for route, s in rows:
+        print(f"{route:<12}{s['count']:>8}{s['error_rate'] * 100:>6.1f}%{s['throughput_rps']:>8.1f}"
+              + "".join(f"{_fmt(s[f'p{p:g}_ms']):>9}" for p in PERCENTILES)
+              + f"{_fmt(s['max_ms']):>9}")
+    print("(latencies in ms)")
+
+
+def compare_reports(old, new):
+    """Print per-route percentile deltas between two saved runs."""
+    print(f"old: {old['meta'].get('started')} ({old['meta'].get('git_rev')})")
+    print(f"new: {new['meta'].get('started')} ({new['meta'].get('git_rev')})")
+    keys = [f"p{p:g}_ms" for p in PERCENTILES]
+    print(f"{'route':<12}" + "".join(f"{k[:-3]:>16}" for k in keys) + f"{'err% Δ':>10}{'rps Δ':>10}")
+    routes = sorted(set(old["routes"]) | set(new["routes"]))
+    for route, a, b in [(r, old["routes"].get(r), new["routes"].get(r)) for r in routes] + \
+                       [("ALL", old["overall"], new["overall"])]:
+        if not a or not b:
+            print(f"{route:<12} only in {'new' if b else 'old'} run")
+            continue
+        cells = []
+        for k in keys:
+            if a[k] is None or b[k] is None:
+                cells.append(f"{'-':>16}")
+            else:
+                pct = (b[k] - a[k]) / a[k] * 100 if a[k] else 0.0
+                cells.append(f"{b[k]:>8.1f} {pct:>+6.0f}%")
+        err = (b["error_rate"] - a["error_rate"]) * 100
+        rps = b["throughput_rps"] - a["throughput_rps"]
+        print(f"{route:<12}" + "".join(cells) + f"{err:>+9.2f}%{rps:>+10.1f}")
+
+
+def _git_rev():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def save_report(report, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(out_dir, f"run_{stamp}_{report['meta'].get('git_rev') or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a message mix against FraudShield.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--source", default="synthetic", help="logs | synthetic | jsonl:PATH")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight,... (default: %(default)s)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="open-loop arrivals per second (default 20)")
+    load.add_argument("--concurrency", type=int, help="closed-loop worker count")
+    parser.add_argument("--arrivals", choices=["uniform", "poisson"], default="poisson")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-workers", type=int, default=256,
+                        help="open-loop sender threads; in-flight cap of the generator")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the JSON result")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="diff two saved runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            compare_reports(json.load(f_old), json.load(f_new))
+        return
+
+    mix = parse_mix(args.mix)
+    workload = Workload(load_messages(args.source), seed=args.seed, base_url=args.base_url,
+                        timeout=args.timeout)
+    for route in mix:
+        workload.build(route)   # fail fast on unknown routes / missing Pillow; mint tokens
+
+    meta = {
+        "started":  time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_rev":  _git_rev(),
+        "base_url": args.base_url,
+        "source":   args.source,
+        "mix":      mix,
+        "duration": args.duration,
+    }
+    if args.concurrency:
+        meta.update(mode=f"closed-loop x{args.concurrency}", concurrency=args.concurrency)
+        recorder, elapsed, lag = run_closed_loop(args.base_url, workload, mix, args.concurrency,
+                                                 args.duration, args.timeout, args.seed)
+    else:
+        rate = args.rate or 20.0
+        meta.update(mode=f"open-loop {rate:g} req/s ({args.arrivals})", rate=rate,
+                    arrivals=args.arrivals)
+        recorder, elapsed, lag = run_open_loop(args.base_url, workload, mix, rate, args.duration,
+                                               args.arrivals, args.timeout, args.max_workers,
+                                               args.seed)
+    meta["max_dispatch_lag_ms"] = round(lag, 1)
+
+    report = build_report(recorder, elapsed, meta)
+    print_report(report)
+    if not args.no_save:
+        print(f"Saved {save_report(report, args.out)}")
+    if report["overall"]["count"] == 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Per-worker sharded log writes.
+With FRAUDSHIELD_LOG_SHARDS=1 each worker process appends its analyses to
+its own SQLite file under logs.d/ instead of contending for the single
+writer lock on logs.db. Shard rows get globally unique ids from a
+per-shard range (SHARD_ID_BASE + shard_no * SHARD_ID_SPAN + n), so report
+links stay valid wherever the row currently lives.
+
+Reads that must be live (stats, recent logs, community feed, top flags)
+query logs.db plus every shard and merge in Python: counts are summed,
+recent rows are k-way merged by timestamp. A compaction pass folds shard
+rows into logs.db in batches, assigning campaigns, rollups and the search
+index on the way in, so those views lag by at most one compaction
+interval. Each shard row is visible in exactly one place: merged reads
+skip shard ids at or below the shard's compacted_upto mark, which moves
+in the same transaction as the copy, and the copied rows are deleted
+from the shard one pass later.
+
+    python log_shards.py            # one compaction pass (cron / sidecar)
+"""
+import os
+import heapq
+import sqlite3
+import threading
+from datetime import datetime
+
+from campaigns    import assign_campaign
+from rollups      import record_rollup
+from result_store import init_result_tables, store_result, prune_results
+
+ENABLED       = os.environ.get("FRAUDSHIELD_LOG_SHARDS") == "1"
+SHARD_DIR     = os.environ.get(
+    "FRAUDSHIELD_SHARD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs.d")
+)
+SHARD_ID_BASE = 1 << 40
+SHARD_ID_SPAN = 1 << 32
+COMPACT_BATCH = 2000
+
+LOG_COLUMNS = ["id", "message", "rule_score", "ai_score", "final_score", "risk_level",
+               "flags", "analyzed_at", "campaign_id", "rule_pack_version"]
+
+
+def init_shard_tables(cursor):
+    """Shard registry + source_id mapping in the main store (called from init_db)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_shards (
+            shard_no       INTEGER PRIMARY KEY AUTOINCREMENT,
+            pid            INTEGER NOT NULL,
+            created_at     TEXT    NOT NULL,
+            compacted_upto INTEGER NOT NULL DEFAULT 0,
+            retired        INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(analysis_logs)")}
+    if "source_id" not in columns:
+        cursor.execute("ALTER TABLE analysis_logs ADD COLUMN source_id INTEGER")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_logs_source_id
+        ON analysis_logs (source_id) WHERE source_id IS NOT NULL
+    """)
+
+
+def shard_path(shard_no):
+    return os.path.join(SHARD_DIR, f"shard-{shard_no:05d}.db")
+
+
+def shard_of(log_id):
+    """Shard number a shard-range id was written to, or None for main-store ids."""
+    if log_id < SHARD_ID_BASE:
+        return None
+    return (log_id - SHARD_ID_BASE) // SHARD_ID_SPAN
+
+
+# ── WRITE SIDE ───────────────────────────────────────────
+
+_writer_lock = threading.Lock()
+_writer = {"pid": None, "path": None}
+
+
+def _create_shard(main_path):
+    conn = sqlite3.connect(main_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO log_shards (pid, created_at) VALUES (?, ?)",
+                   (os.getpid(), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    shard_no = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    path = shard_path(shard_no)
+    shard = sqlite3.connect(path)
+    shard.execute("PRAGMA journal_mode=WAL")
+    cursor = shard.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_logs (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            message     TEXT    NOT NULL,
+            rule_score  INTEGER NOT NULL,
+            ai_score    INTEGER,
+            final_score INTEGER,
+            risk_level  TEXT    NOT NULL,
+            flags       TEXT    NOT NULL,
+            analyzed_at TEXT    NOT NULL,
+            campaign_id INTEGER,
+            rule_pack_version TEXT
+        )
+    """)
+    init_result_tables(cursor)
+    # Start this shard's AUTOINCREMENT at the bottom of its id range
+    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('analysis_logs', ?)",
+                   (SHARD_ID_BASE + shard_no * SHARD_ID_SPAN,))
+    shard.commit()
+    shard.close()
+    return path
+
+
+def _current_shard(main_path):
+    """This process's shard file, registered on first write (and again after fork)."""
+    with _writer_lock:
+        if _writer["pid"] != os.getpid():
+            _writer["path"] = _create_shard(main_path)
+            _writer["pid"] = os.getpid()
+        return _writer["path"]
+
+
+def write_log(main_path, values, result=None):
+    """
+    Append one log row (message .. analyzed_at, rule_pack_version) to this
+    worker's shard. Returns its id.
+    """
+    conn = sqlite3.connect(_current_shard(main_path), timeout=30)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO analysis_logs
+            (message, rule_score, ai_score, final_score, risk_level, flags, analyzed_at,
+             rule_pack_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, values)
+    log_id = cursor.lastrowid
+    if result is not None:
+        store_result(cursor, log_id, result)
+    conn.commit()
+    conn.close()
+    return log_id
+
+
+# ── READ SIDE ────────────────────────────────────────────
+
+def live_shards(main_conn):
+    """[(shard_no, compacted_upto)] for shards that may still hold rows."""
+    if not ENABLED:
+        return []
+    return main_conn.execute(
+        "SELECT shard_no, compacted_upto FROM log_shards WHERE retired = 0"
+    ).fetchall()
+
+
+def read_sources(main_conn):
+    """
+    Yield (conn, where, params) for the main store, then each live shard.
+    `where` excludes shard rows that compaction already copied to main.
+    """
+    if not ENABLED:
+        yield main_conn, "1 = 1", []
+        return
+    # The compaction marks and the main rows must come from one snapshot,
+    # or rows folded in between would be counted twice.
+    main_conn.execute("BEGIN")
+    try:
+        shards = live_shards(main_conn)
+        yield main_conn, "1 = 1", []
+    finally:
+        main_conn.rollback()
+    for shard_no, upto in shards:
+        path = shard_path(shard_no)
+        if not os.path.exists(path):
+            continue
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = main_conn.row_factory
+        try:
+            yield conn, "id > ?", [upto]
+        finally:
+            conn.close()
+
+
+def merge_recent(per_source_rows, limit):
+    """k-way merge of per-source newest-first row lists by analyzed_at."""
+    if len(per_source_rows) == 1:
+        return per_source_rows[0][:limit]
+    merged = heapq.merge(*per_source_rows, key=lambda r: r["analyzed_at"], reverse=True)
+    return [row for _, row in zip(range(limit), merged)]
+
+
+def shard_sequences(main_conn):
+    """Last id handed out by each live shard (for change tokens)."""
+    seqs = []
+    for shard_no, _ in live_shards(main_conn):
+        path = shard_path(shard_no)
+        if not os.path.exists(path):
+            continue
+        conn = sqlite3.connect(path, timeout=30)
+        row = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'analysis_logs'"
+        ).fetchone()
+        conn.close()
+        seqs.append(row[0] if row else 0)
+    return seqs
+
+
+def find_result_payload(main_conn, log_id):
+    """Stored result payload for a shard-range id, wherever the row lives now."""
+    row = main_conn.execute("""
+        SELECT r.payload FROM analysis_logs l
+        JOIN analysis_results r ON r.log_id = l.id
+        WHERE l.source_id = ?
+    """, (log_id,)).fetchone()
+    if row:
+        return row[0]
+    path = shard_path(shard_of(log_id))
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path, timeout=30)
+    row = conn.execute("SELECT payload FROM analysis_results WHERE log_id = ?",
+                       (log_id,)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+# ── COMPACTION ───────────────────────────────────────────
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _fold_batch(main, shard, shard_no, batch_size):
+    """Copy the next batch of shard rows into main. Returns rows moved."""
+    upto = main.execute("SELECT compacted_upto FROM log_shards WHERE shard_no = ?",
+                        (shard_no,)).fetchone()[0]
+    rows = shard.execute("""
+        SELECT id, message, rule_score, ai_score, final_score, risk_level, flags,
+               analyzed_at, rule_pack_version
+        FROM analysis_logs WHERE id > ? ORDER BY id LIMIT ?
+    """, (upto, batch_size)).fetchall()
+    if not rows:
+        return 0
+    payloads = dict(shard.execute(
+        "SELECT log_id, payload FROM analysis_results WHERE log_id BETWEEN ? AND ?",
+        (rows[0][0], rows[-1][0]),
+    ).fetchall())
+
+    cursor = main.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # Another worker may have compacted this shard while we were reading
+        upto = cursor.execute("SELECT compacted_upto FROM log_shards WHERE shard_no = ?",
+                              (shard_no,)).fetchone()[0]
+        rows = [r for r in rows if r[0] > upto]
+        new_id = None
+        for (source_id, message, rule_score, ai_score, final_score, risk_level, flags,
+             analyzed_at, rule_pack_version) in rows:
+            campaign_id = assign_campaign(cursor, message, analyzed_at)
+            record_rollup(cursor, datetime.strptime(analyzed_at, "%Y-%m-%d %H:%M:%S"),
+                          risk_level, final_score, flags.split(", ") if flags else [])
+            cursor.execute("""
+                INSERT INTO analysis_logs
+                    (message, rule_score, ai_score, final_score, risk_level, flags, analyzed_at,
+                     campaign_id, rule_pack_version, source_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (message, rule_score, ai_score, final_score, risk_level, flags, analyzed_at,
+                  campaign_id, rule_pack_version, source_id))
+            new_id = cursor.lastrowid
+            if source_id in payloads:
+                cursor.execute("INSERT INTO analysis_results (log_id, payload) VALUES (?, ?)",
+                               (new_id, payloads[source_id]))
+        if rows:
+            cursor.execute("UPDATE log_shards SET compacted_upto = ? WHERE shard_no = ?",
+                           (rows[-1][0], shard_no))
+            prune_results(cursor, new_id)
+        main.commit()
+    except BaseException:
+        main.rollback()
+        raise
+    return len(rows)
+
+
+def compact(main_path, batch_size=COMPACT_BATCH):
+    """
+    Fold every shard into the main store. Safe to run from several
+    processes at once. Returns the number of rows moved.
+    """
+    main = sqlite3.connect(main_path, timeout=30, isolation_level=None)
+    moved = 0
+    try:
+        shards = main.execute(
+            "SELECT shard_no, pid, compacted_upto FROM log_shards WHERE retired = 0"
+        ).fetchall()
+        for shard_no, pid, previous_upto in shards:
+            path = shard_path(shard_no)
+            if not os.path.exists(path):
+                main.execute("UPDATE log_shards SET retired = 1 WHERE shard_no = ?", (shard_no,))
+                continue
+            shard = sqlite3.connect(path, timeout=30)
+            try:
+                while True:
+                    n = _fold_batch(main, shard, shard_no, batch_size)
+                    moved += n
+                    if n < batch_size:
+                        break
+
+                # Drop rows folded by an earlier pass; a reader that saw the
+                # old mark is long done with them by now.
+                shard.execute("DELETE FROM analysis_logs WHERE id <= ?", (previous_upto,))
+                shard.execute("DELETE FROM analysis_results WHERE log_id <= ?", (previous_upto,))
+                shard.commit()
+
+                upto = main.execute("SELECT compacted_upto FROM log_shards WHERE shard_no = ?",
+                                    (shard_no,)).fetchone()[0]
+                pending = shard.execute("SELECT COUNT(*) FROM analysis_logs WHERE id > ?",
+                                        (upto,)).fetchone()[0]
+            finally:
+                shard.close()
+
+            # Retire a dead worker's shard one pass after it drained, for the
+            # same reason the deletes above lag by one pass.
+            if (pending == 0 and upto == previous_upto
+                    and pid != os.getpid() and not _process_alive(pid)):
+                main.execute("UPDATE log_shards SET retired = 1 WHERE shard_no = ?", (shard_no,))
+                for suffix in ("", "-wal", "-shm"):
+                    try:
+                        os.remove(path + suffix)
+                    except FileNotFoundError:
+                        pass
+    finally:
+        main.close()
+    return moved
+
+
+def start_compactor(main_path, interval=30.0, on_error=None):
+    """Run compact() every `interval` seconds in a daemon thread."""
+    def loop():
+        stop = threading.Event()
+        while not stop.wait(interval):
+            try:
+                compact(main_path)
+            except sqlite3.Error as e:
+                if on_error:
+                    on_error(e)
+
+    thread = threading.Thread(target=loop, name="log-shard-compactor", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    from database import DB_PATH, init_db
+    init_db()
+    print(f"Compacted {compact(DB_PATH)} rows into {DB_PATH}.")
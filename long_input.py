@@ -0,0 +1,102 @@
+"""
+Long-input mode: windowed streaming analysis.
+Very long inputs (pasted email threads, multi-page OCR) are split into
+overlapping windows that are scored one at a time. Scoring stops early
+once a window is conclusively HIGH, and the per-window results are folded
+into a single verdict. Only a capped prefix of the text is kept for
+display, explainability and storage, so cost stays bounded by the window
+size rather than the input size.
+"""
+from rule_engine  import score_labels as rule_score_labels
+from multilingual import score_labels as multi_score_labels
+
+LONG_INPUT_THRESHOLD = 6000   # chars; shorter messages take the normal path
+WINDOW_SIZE          = 1200
+WINDOW_OVERLAP       = 200    # catches phrases that straddle a boundary
+MAX_WINDOWS          = 64     # hard cap on work per request
+MAX_STORED_CHARS     = 6000   # text kept for display, XAI and analysis_logs
+
+
+def iter_windows(text, size=WINDOW_SIZE, overlap=WINDOW_OVERLAP):
+    """Yield (start, end) offsets of overlapping windows, split on whitespace."""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            cut = text.rfind(' ', start + size // 2, end)
+            if cut != -1:
+                end = cut
+        yield start, end
+        if end >= length:
+            break
+        next_start = max(end - overlap, start + 1)
+        space = text.find(' ', next_start, end)
+        start = space + 1 if space != -1 else next_start
+
+
+def cap_text(text, limit=MAX_STORED_CHARS):
+    """Trim text to `limit` chars on a word boundary. Returns (text, truncated)."""
+    if len(text) <= limit:
+        return text, False
+    cut = text.rfind(' ', limit // 2, limit)
+    return text[:cut if cut != -1 else limit].rstrip() + ' …', True
+
+
+def _merge_labels(into, seen, labels):
+    for label in labels:
+        if label not in seen:
+            seen.add(label)
+            into.append(label)
+
+
+def analyze_long_input(text, score_window, is_conclusive, pack=None):
+    """
+    Stream windows of `text` through `score_window(window_text)` (which
+    returns the core score dict used by full_analysis) and aggregate.
+
+    Labels are unioned across windows and re-scored, so the rule and
+    multilingual scores match a whole-text scan. The AI score is the
+    maximum over windows, which keeps one scam paragraph from being
+    diluted by a long benign thread. Spans are shifted to text offsets.
+    """
+    phrases, phrase_seen = [], set()
+    multi_flags, multi_seen = [], set()
+    rule_spans, multi_spans = [], []
+    ai_score = 0
+    scanned = 0
+    early_exit = False
+
+    windows = list(iter_windows(text))
+    total = len(windows)
+
+    for start, end in windows[:MAX_WINDOWS]:
+        window = score_window(text[start:end])
+        scanned += 1
+
+        _merge_labels(phrases, phrase_seen, window['detected_phrases'])
+        _merge_labels(multi_flags, multi_seen, window['multilingual_flags'])
+        rule_spans.extend((s + start, e + start, label) for s, e, label in window['rule_spans'])
+        multi_spans.extend((s + start, e + start, label) for s, e, label in window['multi_spans'])
+        ai_score = max(ai_score, window['ai_score'])
+
+        if is_conclusive(window):
+            early_exit = scanned < total
+            break
+
+    combined_rule = min(100, rule_score_labels(phrases, pack) + multi_score_labels(multi_flags, pack))
+    return {
+        'detected_phrases':   phrases,
+        'rule_spans':         rule_spans,
+        'ai_score':           ai_score,
+        'multilingual_flags': multi_flags,
+        'multi_spans':        multi_spans,
+        'combined_rule':      combined_rule,
+        'long_input': {
+            'length':       len(text),
+            'windows':      total,
+            'scanned':      scanned,
+            'early_exit':   early_exit,
+            'scanned_upto': windows[scanned - 1][1] if scanned else 0,
+        },
+    }
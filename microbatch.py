@@ -0,0 +1,132 @@
+"""
+Dynamic micro-batching for model calls made by concurrent requests.
+The first caller to arrive opens a batch and waits up to the batch window
+(or until the batch is full) while other threads join it, then runs one
+vectorized call for everyone and hands each caller its own result. There
+is no background thread: the opening caller does the work.
+
+    FRAUDSHIELD_BATCH_WINDOW_MS   how long a batch stays open (default 0 = off)
+    FRAUDSHIELD_BATCH_MAX         close the batch early at this size (default 32)
+
+With the window at 0 every call runs immediately as a batch of one.
+"""
+import os
+import time
+import threading
+from collections import Counter, deque
+
+DELAY_SAMPLES = 1024   # recent per-item queueing delays kept for percentiles
+
+
+class _Batch:
+    __slots__ = ("items", "enqueued", "results", "error", "full", "done")
+
+    def __init__(self):
+        self.items = []
+        self.enqueued = []
+        self.results = None
+        self.error = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, window_ms=0.0, max_batch=32):
+        """run_batch(items) must return one result per item, in order."""
+        self.run_batch = run_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._lock = threading.Lock()
+        self._open = None
+        self.batches = 0
+        self.items = 0
+        self.sizes = Counter()
+        self.delays = deque(maxlen=DELAY_SAMPLES)
+        self.run_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, run_batch):
+        return cls(
+            run_batch,
+            window_ms=float(os.environ.get("FRAUDSHIELD_BATCH_WINDOW_MS", 0)),
+            max_batch=int(os.environ.get("FRAUDSHIELD_BATCH_MAX", 32)),
+        )
+
+    @property
+    def enabled(self):
+        return self.window > 0 and self.max_batch > 1
+
+    def submit(self, item):
+        """Result of run_batch for `item`, computed together with concurrent callers."""
+        if not self.enabled:
+            batch = _Batch()
+            batch.items.append(item)
+            batch.enqueued.append(time.perf_counter())
+            self._run(batch)
+            return self._result(batch, 0)
+
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            batch.enqueued.append(time.perf_counter())
+            if len(batch.items) >= self.max_batch:
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._run(batch)
+        else:
+            batch.done.wait()
+        return self._result(batch, index)
+
+    def _run(self, batch):
+        start = time.perf_counter()
+        try:
+            batch.results = self.run_batch(batch.items)
+        except Exception as e:
+            batch.error = e
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch.items)
+                self.sizes[len(batch.items)] += 1
+                self.delays.extend(start - t for t in batch.enqueued)
+                self.run_seconds += elapsed
+            batch.done.set()
+
+    @staticmethod
+    def _result(batch, index):
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def stats(self):
+        with self._lock:
+            delays = sorted(self.delays)
+            sizes = dict(sorted(self.sizes.items()))
+            batches, items, run_seconds = self.batches, self.items, self.run_seconds
+
+        def pct(p):
+            return round(delays[min(len(delays) - 1, int(p * len(delays)))] * 1000, 3) if delays else 0.0
+
+        return {
+            "enabled":         self.enabled,
+            "window_ms":       self.window * 1000,
+            "max_batch":       self.max_batch,
+            "batches":         batches,
+            "items":           items,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_sizes":     sizes,
+            "queue_delay_ms":  {"p50": pct(0.50), "p95": pct(0.95), "max": pct(1.0)},
+            "mean_run_ms":     round(run_seconds / batches * 1000, 3) if batches else 0.0,
+        }
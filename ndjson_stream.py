@@ -0,0 +1,99 @@
+"""
+Chunked NDJSON streaming ingest.
+Reads a newline-delimited JSON request body of any length one line at a
+time and yields one NDJSON result line per input line, in order. Nothing
+is buffered beyond the current line, and the next line is only read once
+the previous result has been handed to the server — so a slow reader
+throttles the stream instead of growing memory.
+
+Input lines:   {"message": "...", "id": "optional client id"}   or   "..."
+Output lines:  {"line": 1, "id": ..., "final_score": 82, "risk_level": "HIGH", ...}
+Errors:        {"line": 2, "id": ..., "error": "invalid JSON: ..."}
+Trailer:       {"done": true, "lines": 2, "errors": 1}
+"""
+import json
+import time
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+def _dump(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _read_lines(stream, max_line=MAX_LINE_BYTES):
+    """Yield (raw_line_or_None, too_long) without holding more than max_line bytes."""
+    while True:
+        line = stream.readline(max_line + 1)
+        if not line:
+            return
+        if len(line) > max_line and not line.endswith(b"\n"):
+            # Discard the rest of the oversized line in bounded reads
+            while True:
+                rest = stream.readline(max_line)
+                if not rest or rest.endswith(b"\n"):
+                    break
+            yield None, True
+            continue
+        yield line, False
+
+
+class LineError(ValueError):
+    """A per-line problem reported back to the client; carries the id if known."""
+
+    def __init__(self, reason, client_id=None):
+        super().__init__(reason)
+        self.client_id = client_id
+
+
+def parse_line(raw):
+    """Return (message, client_id). Raises LineError with a client-safe reason."""
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        raise LineError("line is not valid UTF-8")
+    try:
+        record = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise LineError(f"invalid JSON: {e.msg}")
+
+    client_id = None
+    if isinstance(record, dict):
+        client_id = record.get("id")
+        record = record.get("message")
+    if not isinstance(record, str) or not record.strip():
+        raise LineError('expected a non-empty "message" string', client_id)
+    return record.strip(), client_id
+
+
+def stream_results(stream, analyze, on_latency=None):
+    """
+    Generator of NDJSON result lines for an input byte stream.
+    `analyze(message)` returns the result dict to emit (sans line/id).
+    """
+    lines = errors = 0
+    for raw, too_long in _read_lines(stream):
+        if raw is not None and not raw.strip():
+            continue  # blank keep-alive lines
+        lines += 1
+        out = {"line": lines}
+        try:
+            if too_long:
+                raise LineError(f"line exceeds {MAX_LINE_BYTES} bytes")
+            message, client_id = parse_line(raw)
+            if client_id is not None:
+                out["id"] = client_id
+            start = time.perf_counter()
+            out.update(analyze(message))
+            if on_latency:
+                on_latency((time.perf_counter() - start) * 1000)
+        except LineError as e:
+            errors += 1
+            if e.client_id is not None:
+                out["id"] = e.client_id
+            out["error"] = str(e)
+        except Exception:
+            errors += 1
+            out["error"] = "internal error while analyzing this line"
+        yield _dump(out)
+    yield _dump({"done": True, "lines": lines, "errors": errors})
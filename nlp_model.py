@@ -1,7 +1,11 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
+import os
 import re
+import sys
+import json
+import math
+import time
+import hashlib
+import threading
 
 TRAINING_DATA = [
     ("Your bank account has been blocked. Update KYC immediately to unblock. Click here: http://scam.link/kyc", 1),
@@ -61,17 +65,213 @@ def clean_text(text):
     return text
 
 
-_texts = [clean_text(msg) for msg, _ in TRAINING_DATA]
-_labels = [label for _, label in TRAINING_DATA]
+NGRAM_RANGE  = (1, 2)
+MAX_FEATURES = 600
+CLF_C        = 1.5
 
-_pipeline = Pipeline([
-    ('tfidf', TfidfVectorizer(ngram_range=(1, 2), max_features=600)),
-    ('clf', LogisticRegression(max_iter=1000, C=1.5))
-])
-_pipeline.fit(_texts, _labels)
+COMPILED_MODEL_PATH = os.path.join(os.path.dirname(__file__), "model_compiled.json")
+
+_pipeline_lock = threading.Lock()
+_pipeline_cache = None
+
+
+def _train_pipeline():
+    # sklearn is imported here, not at module load, so importing this
+    # module (and app) stays cheap until the first scoring call.
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    texts = [clean_text(msg) for msg, _ in TRAINING_DATA]
+    labels = [label for _, label in TRAINING_DATA]
+
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer(ngram_range=NGRAM_RANGE, max_features=MAX_FEATURES)),
+        ('clf', LogisticRegression(max_iter=1000, C=CLF_C))
+    ])
+    pipeline.fit(texts, labels)
+    return pipeline
+
+
+def get_pipeline():
+    """Return the fitted TF-IDF + LogisticRegression pipeline, training it on first use."""
+    global _pipeline_cache
+    if _pipeline_cache is None:
+        with _pipeline_lock:
+            if _pipeline_cache is None:
+                _pipeline_cache = _train_pipeline()
+    return _pipeline_cache
+
+
+def __getattr__(name):
+    # Backwards compatibility for `from nlp_model import _pipeline`
+    if name == '_pipeline':
+        return get_pipeline()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ── COMPILED SCORER ──────────────────────────────────────
+# The fitted model is a linear function of l2-normalised TF-IDF counts, so
+# it compiles to one lookup: n-gram -> (idf, coefficient). Scoring a message
+# is then a tokenize + a few dozen multiply-adds, with no sklearn on the path.
+
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")   # sklearn's default token_pattern
+
+
+def model_fingerprint():
+    """Hash of everything the fitted model depends on."""
+    payload = json.dumps([TRAINING_DATA, NGRAM_RANGE, MAX_FEATURES, CLF_C])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def compile_model(pipeline):
+    """Flatten a fitted pipeline into a JSON-serialisable lookup table."""
+    vectorizer = pipeline.named_steps['tfidf']
+    classifier = pipeline.named_steps['clf']
+    coefs = classifier.coef_[0]
+    return {
+        "fingerprint": model_fingerprint(),
+        "ngram_range": list(vectorizer.ngram_range),
+        "intercept":   float(classifier.intercept_[0]),
+        "weights": {
+            term: [float(vectorizer.idf_[idx]), float(coefs[idx])]
+            for term, idx in sorted(vectorizer.vocabulary_.items())
+        },
+    }
+
+
+class CompiledScorer:
+    """Pure-Python replica of pipeline.predict_proba for one text at a time."""
+
+    def __init__(self, compiled):
+        self.fingerprint = compiled["fingerprint"]
+        self.min_n, self.max_n = compiled["ngram_range"]
+        self.intercept = compiled["intercept"]
+        self.weights = {term: tuple(w) for term, w in compiled["weights"].items()}
+
+    def ngrams(self, text):
+        """Reproduce TfidfVectorizer's lowercase + token_pattern + word n-grams."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        grams = []
+        for n in range(self.min_n, self.max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                grams.append(tokens[i] if n == 1 else " ".join(tokens[i:i + n]))
+        return grams
+
+    def tfidf(self, text):
+        """{term: (l2-normalised tfidf value, coefficient)} for in-vocabulary terms."""
+        counts = {}
+        for gram in self.ngrams(text):
+            if gram in self.weights:
+                counts[gram] = counts.get(gram, 0) + 1
+        values = {term: n * self.weights[term][0] for term, n in counts.items()}
+        norm = math.sqrt(sum(v * v for v in values.values())) or 1.0
+        return {term: (v / norm, self.weights[term][1]) for term, v in values.items()}
+
+    def decision(self, text):
+        return self.intercept + sum(v * coef for v, coef in self.tfidf(text).values())
+
+    def proba(self, text):
+        """Fraud-class probability for already-cleaned text."""
+        return 1.0 / (1.0 + math.exp(-self.decision(text)))
+
+    def proba_bounds(self):
+        """
+        Lowest and highest probability any text can get. The tf-idf vector
+        is non-negative with unit l2 norm, so the weighted sum lies within
+        the norms of the negative and positive coefficients (Cauchy-Schwarz);
+        text with no known n-gram scores the intercept, which is inside.
+        """
+        pos = math.sqrt(sum(c * c for _, c in self.weights.values() if c > 0))
+        neg = math.sqrt(sum(c * c for _, c in self.weights.values() if c < 0))
+        return (1.0 / (1.0 + math.exp(-(self.intercept - neg))),
+                1.0 / (1.0 + math.exp(-(self.intercept + pos))))
+
+
+_scorer_cache = None
+
+
+def export_compiled_model(path=COMPILED_MODEL_PATH):
+    """Compile the fitted pipeline and write it next to this module."""
+    compiled = compile_model(get_pipeline())
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(compiled, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, path)
+    return compiled
+
+
+def get_scorer():
+    """
+    Return the compiled scorer, loading model_compiled.json when it matches
+    the current training data, else compiling from the sklearn pipeline.
+    """
+    global _scorer_cache, _pipeline_cache
+    if _scorer_cache is None:
+        with _pipeline_lock:
+            if _scorer_cache is None:
+                compiled = None
+                if os.path.exists(COMPILED_MODEL_PATH):
+                    with open(COMPILED_MODEL_PATH) as f:
+                        compiled = json.load(f)
+                    if compiled.get("fingerprint") != model_fingerprint():
+                        compiled = None  # stale export — retrain below
+                if compiled is None:
+                    if _pipeline_cache is None:
+                        _pipeline_cache = _train_pipeline()
+                    compiled = compile_model(_pipeline_cache)
+                _scorer_cache = CompiledScorer(compiled)
+    return _scorer_cache
 
 
 def get_ai_score(message):
     cleaned = clean_text(message)
-    proba = _pipeline.predict_proba([cleaned])[0]
-    return int(round(proba[1] * 100))
+    proba = get_scorer().proba(cleaned)
+    return int(round(proba * 100))
+
+
+def ai_score_bounds():
+    """(lowest, highest) value get_ai_score() can return for any message."""
+    low, high = get_scorer().proba_bounds()
+    return int(round(low * 100)), int(round(high * 100))
+
+
+def check_parity(messages=None, tolerance=1e-9):
+    """
+    Compare the compiled scorer with the sklearn pipeline.
+    Returns (max_abs_diff, sklearn_us_per_msg, compiled_us_per_msg).
+    """
+    if messages is None:
+        messages = [msg for msg, _ in TRAINING_DATA]
+        messages += [msg.upper() + " http://x.example/verify?id=1" for msg in messages]
+        messages += ["", "ok", "नमस्ते OTP 1234 share karo", "a " * 50]
+    cleaned = [clean_text(m) for m in messages]
+    pipeline = get_pipeline()
+    scorer = get_scorer()
+
+    start = time.perf_counter()
+    expected = [pipeline.predict_proba([text])[0][1] for text in cleaned]
+    sklearn_us = (time.perf_counter() - start) / len(cleaned) * 1e6
+
+    start = time.perf_counter()
+    actual = [scorer.proba(text) for text in cleaned]
+    compiled_us = (time.perf_counter() - start) / len(cleaned) * 1e6
+
+    max_diff = max(abs(a - b) for a, b in zip(expected, actual))
+    if max_diff > tolerance:
+        raise AssertionError(f"compiled scorer drifted from sklearn by {max_diff:.3g}")
+    return max_diff, sklearn_us, compiled_us
+
+
+if __name__ == "__main__":
+    if "--export" in sys.argv:
+        compiled = export_compiled_model()
+        print(f"Wrote {COMPILED_MODEL_PATH} ({len(compiled['weights'])} n-grams, "
+              f"fingerprint {compiled['fingerprint']}).")
+    try:
+        diff, sk_us, comp_us = check_parity()
+    except AssertionError as e:
+        print(f"FAIL: {e}")
+        sys.exit(1)
+    print(f"Parity OK (max |Δp| = {diff:.2e}); "
+          f"sklearn {sk_us:.0f} µs/msg, compiled {comp_us:.1f} µs/msg.")
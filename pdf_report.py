@@ -112,17 +112,24 @@ def generate_pdf_report(result):
     story.append(Paragraph('01 // THREAT VERDICT', section_style))
     story.append(HRFlowable(width=w, thickness=0.5, color=C_BORDER, spaceAfter=8))
 
+    # A cascade rules-tier exit has no final score, only the range it lies in
+    final_text = result["final_score"]
+    if final_text is None:
+        final_text = "–".join(map(str, (result.get("cascade") or {}).get("score_range", ["—"])))
+
     verdict_data = [[
         Paragraph(f'{result["risk_level"]} RISK', S('VL', fontSize=36, textColor=rc, fontName='Helvetica-Bold', leading=38)),
         Table([
             [Paragraph('FINAL THREAT SCORE', caption_style)],
-            [Paragraph(f'{result["final_score"]}<font size="14" color="#999"> / 100</font>', S('FS', fontSize=32, textColor=rc, fontName='Helvetica-Bold', leading=34))],
+            [Paragraph(f'{final_text}<font size="14" color="#999"> / 100</font>', S('FS', fontSize=32, textColor=rc, fontName='Helvetica-Bold', leading=34))],
         ], colWidths=[w*0.35]),
         Table([
             [Paragraph('RULE ENGINE', caption_style), Paragraph('AI CLASSIFIER', caption_style)],
             [Paragraph(str(result['rule_score']), S('RS', fontSize=22, textColor=colors.HexColor('#7b5ea7'), fontName='Helvetica-Bold')),
-             Paragraph(str(result['ai_score']),   S('AS', fontSize=22, textColor=C_AMBER, fontName='Helvetica-Bold'))],
-            [Paragraph('/ 100', caption_style), Paragraph('/ 100', caption_style)],
+             Paragraph('—' if result['ai_score'] is None else str(result['ai_score']),
+                       S('AS', fontSize=22, textColor=C_AMBER, fontName='Helvetica-Bold'))],
+            [Paragraph('/ 100', caption_style),
+             Paragraph('skipped' if result['ai_score'] is None else '/ 100', caption_style)],
         ], colWidths=[w*0.175, w*0.175]),
     ]]
     verdict_table = Table(verdict_data, colWidths=[w*0.28, w*0.36, w*0.36])
@@ -0,0 +1,289 @@
+"""
+On-demand profiling of live requests.
+A request is profiled when an admin sends `X-Profile: 1` (with a valid
+X-Admin-Token) or when it falls in the sampled share of traffic
+(FRAUDSHIELD_PROFILE_SAMPLE, e.g. 0.001). For a profiled request:
+
+  * a sampling profiler records the handling thread's stack every
+    FRAUDSHIELD_PROFILE_INTERVAL_MS (default 1) and saves it as collapsed
+    stacks (`a;b;c 12` lines) for flamegraph.pl / speedscope;
+  * tracemalloc snapshots taken before and after are diffed, giving the
+    lines whose retained allocations grew during the request.
+
+Files land in profiles/ named by request id; the newest PROFILE_KEEP are
+kept. With no header and sampling at 0 the wrapper is a single dict
+lookup, so the mode costs nothing when off. Only one request is profiled
+at a time per process, since tracemalloc is process-wide. Capture stops
+after FRAUDSHIELD_PROFILE_MAX_MS (default 10000) even if the request is
+still running, as a long /api/stream would otherwise keep tracemalloc
+on and every other request unprofiled; such profiles are marked capped.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+import tracemalloc
+from collections import Counter
+from functools import wraps
+
+from flask import request, make_response
+
+PROFILE_DIR  = os.environ.get(
+    "FRAUDSHIELD_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+)
+PROFILE_KEEP = 50
+FORMATS = {
+    "collapsed": (".collapsed.txt", "text/plain"),
+    "memory":    (".memory.txt",    "text/plain"),
+    "json":      (".json",          "application/json"),
+}
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval, max_seconds=None, on_cap=None):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.on_cap = on_cap
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        deadline = time.perf_counter() + self.max_seconds if self.max_seconds else None
+        while not self._stop_event.wait(self.interval):
+            if deadline and time.perf_counter() >= deadline:
+                if self.on_cap:
+                    self.on_cap()
+                return
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        if threading.current_thread() is not self:
+            self.join()
+
+
+def _current_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _request_meta():
+    """
+    What a profile records about its request. The analysed text itself is
+    never written to disk, only its length and hash; streamed bodies are
+    left unread.
+    """
+    message = ""
+    if request.method == "POST":
+        if request.is_json:
+            payload = request.get_json(silent=True)
+            message = payload.get("message") if isinstance(payload, dict) else ""
+        elif request.mimetype in ("application/x-www-form-urlencoded", "multipart/form-data"):
+            message = request.form.get("message", "")
+    if not isinstance(message, str):
+        message = ""
+    return {
+        "method":      request.method,
+        "path":        request.path,
+        "started":     time.strftime("%Y-%m-%d %H:%M:%S"),
+        "input_chars": len(message),
+        "input_sha1":  hashlib.sha1(message.encode("utf-8")).hexdigest() if message else None,
+    }
+
+
+class RequestProfiler:
+    def __init__(self, sample_rate=0.0, interval_ms=1.0, profile_dir=PROFILE_DIR,
+                 keep=PROFILE_KEEP, max_ms=10000):
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_ms / 1000
+        self.profile_dir = profile_dir
+        self.keep = keep
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            sample_rate=float(os.environ.get("FRAUDSHIELD_PROFILE_SAMPLE", 0)),
+            interval_ms=float(os.environ.get("FRAUDSHIELD_PROFILE_INTERVAL_MS", 1)),
+            max_ms=float(os.environ.get("FRAUDSHIELD_PROFILE_MAX_MS", 10000)),
+        )
+
+    def _trigger(self, is_authorized):
+        if "X-Profile" in request.headers:
+            return "header" if is_authorized() else None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def start(self, trigger, request_id, on_cap=None):
+        """
+        Start profiling the current request; pass the result to finish().
+        `on_cap(session)` is called from the sampler thread when the capture
+        window runs out before the request ends.
+        """
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+        rss_before = _current_rss_kb()
+        # Read the request now: a streamed body finishes after its context is gone
+        session = {"trigger": trigger, "request_id": request_id, "request": _request_meta(),
+                   "started_tracing": started_tracing, "before": before,
+                   "rss_before": rss_before, "start": time.perf_counter(),
+                   "finishing": threading.Lock(), "capped": False}
+        session["sampler"] = sampler = _StackSampler(
+            threading.get_ident(), self.interval, self.max_seconds,
+            on_cap and (lambda: on_cap(session)))
+        sampler.start()
+        return session
+
+    def finish(self, session, capped=False):
+        """
+        Stop capturing and save the profile. Only the first call (request
+        end or capture cap) does anything; it returns True.
+        """
+        if not session["finishing"].acquire(blocking=False):
+            return False
+        wall_ms = (time.perf_counter() - session["start"]) * 1000
+        session["capped"] = capped
+        session["sampler"].stop()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if session["started_tracing"]:
+            tracemalloc.stop()
+        self._save(session, wall_ms, after, peak, _current_rss_kb())
+        return True
+
+    def _save(self, session, wall_ms, after, peak, rss_after):
+        request_id, sampler = session["request_id"], session["sampler"]
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, request_id)
+
+        with open(base + ".collapsed.txt", "w") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        diff = after.compare_to(session["before"], "lineno")
+        growth = sum(stat.size_diff for stat in diff)
+        with open(base + ".memory.txt", "w") as f:
+            f.write(f"net traced growth: {growth / 1024:.1f} KiB, "
+                    f"peak traced: {peak / 1024:.1f} KiB\n\n")
+            for stat in diff[:40]:
+                f.write(f"{stat}\n")
+
+        meta = {
+            "id":            request_id,
+            "trigger":       session["trigger"],
+            **session["request"],
+            "wall_ms":       round(wall_ms, 2),
+            "capped":        session["capped"],
+            "samples":       sum(sampler.stacks.values()),
+            "interval_ms":   self.interval * 1000,
+            "mem_growth_kb": round(growth / 1024, 1),
+            "mem_peak_kb":   round(peak / 1024, 1),
+            "rss_before_kb": session["rss_before"],
+            "rss_after_kb":  rss_after,
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        self._trim()
+
+    def _trim(self):
+        metas = sorted(
+            (os.path.getmtime(os.path.join(self.profile_dir, name)), name[:-5])
+            for name in os.listdir(self.profile_dir) if name.endswith(".json")
+        )
+        for _, request_id in metas[:-self.keep]:
+            for suffix, _ in FORMATS.values():
+                try:
+                    os.remove(os.path.join(self.profile_dir, request_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self):
+        """Metadata of saved profiles, newest first."""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        metas = []
+        for name in os.listdir(self.profile_dir):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.profile_dir, name)) as f:
+                        metas.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(metas, key=lambda m: m.get("started", ""), reverse=True)
+
+    def profile_path(self, request_id, fmt):
+        """Path of one saved artifact, or None (also for malformed ids)."""
+        if fmt not in FORMATS or not request_id.isalnum():
+            return None
+        path = os.path.join(self.profile_dir, request_id + FORMATS[fmt][0])
+        return path if os.path.exists(path) else None
+
+
+def profiled(profiler, is_authorized):
+    """
+    Route decorator: profile this request if asked to (see module
+    docstring). The profile id is returned in the X-Profile-Id header.
+    A streamed response is profiled until its body is closed or the
+    capture window runs out, whichever comes first.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            trigger = profiler._trigger(is_authorized)
+            if trigger is None or not profiler._busy.acquire(blocking=False):
+                return view(*args, **kwargs)
+            request_id = uuid.uuid4().hex[:16]
+
+            def done(session, capped=False):
+                try:
+                    finished = profiler.finish(session, capped)
+                except BaseException:
+                    profiler._busy.release()
+                    raise
+                if finished:
+                    profiler._busy.release()
+
+            streamed = False
+            try:
+                session = profiler.start(trigger, request_id,
+                                         on_cap=lambda s: done(s, capped=True))
+            except BaseException:
+                profiler._busy.release()
+                raise
+            try:
+                resp = make_response(view(*args, **kwargs))
+                streamed = resp.is_streamed
+            finally:
+                if not streamed:
+                    done(session)
+            if streamed:
+                resp.call_on_close(lambda: done(session))
+            resp.headers["X-Profile-Id"] = request_id
+            return resp
+        return wrapper
+    return decorator
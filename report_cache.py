@@ -0,0 +1,165 @@
+"""
+Cached PDF rendering for /report/<token>.pdf.
+Reports are rendered by a small background thread pool from the retained
+result of an analysis and written to an on-disk cache keyed by log id.
+Repeat downloads and shared links are served straight from disk;
+concurrent requests for the same id share one render. The cache is
+trimmed oldest-first (by last access) once it grows past its byte budget.
+
+Reports contain the analysed message, so they are only served by token:
+"<log id>-<HMAC of the id>". Log ids are sequential, the HMAC is not, so
+holding one link gives no way to guess another. The key comes from
+FRAUDSHIELD_REPORT_SECRET, or is generated once into the cache directory
+and shared by every worker (deleting it invalidates all issued links).
+
+    FRAUDSHIELD_REPORT_CACHE_DIR     cache directory (default ./report_cache)
+    FRAUDSHIELD_REPORT_CACHE_MB      size budget (default 256)
+    FRAUDSHIELD_REPORT_WORKERS       render threads per process (default 2)
+    FRAUDSHIELD_REPORT_SECRET        key for report tokens (default: generated)
+"""
+import os
+import hmac
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT_FORMAT = 1   # bump when pdf_report output changes, orphaning old files
+RENDER_TIMEOUT = 30
+SECRET_FILE = "report.key"
+TOKEN_HEX = 32      # 128 bits of HMAC-SHA256 per token
+
+
+class ReportCache:
+    def __init__(self, render, load_result, cache_dir, max_bytes, workers=2, secret=None):
+        self.render = render
+        self.load_result = load_result
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._secret = secret.encode("utf-8") if secret else None   # loaded on first use
+
+        self._lock = threading.Lock()
+        self._pending = {}     # log_id -> Future
+        self._pool = None      # created on first render
+
+    @classmethod
+    def from_env(cls, render, load_result):
+        return cls(
+            render, load_result,
+            cache_dir=os.environ.get(
+                "FRAUDSHIELD_REPORT_CACHE_DIR",
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_cache"),
+            ),
+            max_bytes=int(os.environ.get("FRAUDSHIELD_REPORT_CACHE_MB", 256)) * 1024 * 1024,
+            workers=int(os.environ.get("FRAUDSHIELD_REPORT_WORKERS", 2)),
+            secret=os.environ.get("FRAUDSHIELD_REPORT_SECRET") or None,
+        )
+
+    def _key(self):
+        if self._secret is None:
+            path = os.path.join(self.cache_dir, SECRET_FILE)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            try:
+                # O_EXCL: when workers race, exactly one key is written and all read it
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                with open(path, "rb") as f:
+                    key = f.read().strip()
+                if not key:
+                    raise RuntimeError(f"{path} is empty; delete it or set FRAUDSHIELD_REPORT_SECRET")
+            else:
+                key = secrets.token_hex(32).encode("ascii")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(key)
+            self._secret = key
+        return self._secret
+
+    def _signature(self, log_id):
+        digest = hmac.new(self._key(), str(log_id).encode("ascii"), hashlib.sha256)
+        return digest.hexdigest()[:TOKEN_HEX]
+
+    def token_for(self, log_id):
+        """Unguessable public name of the report for `log_id`."""
+        return f"{log_id}-{self._signature(log_id)}"
+
+    def log_id_for(self, token):
+        """The log id a report token was issued for, or None if it does not verify."""
+        log_id, _, signature = token.partition("-")
+        if not log_id.isdigit() or len(signature) != TOKEN_HEX:
+            return None
+        log_id = int(log_id)
+        if not hmac.compare_digest(signature, self._signature(log_id)):
+            return None
+        return log_id
+
+    def path_for(self, log_id):
+        return os.path.join(self.cache_dir, f"{log_id}.v{REPORT_FORMAT}.pdf")
+
+    def get(self, log_id, timeout=RENDER_TIMEOUT):
+        """
+        PDF bytes for `log_id`, or None when no result is retained for it.
+        Raises concurrent.futures.TimeoutError if the render takes too long.
+        """
+        path = self.path_for(log_id)
+        try:
+            with open(path, "rb") as f:
+                pdf = f.read()
+            os.utime(path)   # mark as recently used for eviction
+            return pdf
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            future = self._pending.get(log_id)
+            if future is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="pdf-render")
+                future = self._pool.submit(self._render, log_id)
+                self._pending[log_id] = future
+        return future.result(timeout=timeout)
+
+    def _render(self, log_id):
+        try:
+            result = self.load_result(log_id)
+            if result is None:
+                return None
+            pdf = self.render(result)
+            self._write(log_id, pdf)
+            return pdf
+        finally:
+            with self._lock:
+                self._pending.pop(log_id, None)
+
+    def _write(self, log_id, pdf):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path_for(log_id)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp, path)
+            self.evict()
+        except OSError:
+            pass  # caching is best-effort; the PDF is still returned
+
+    def evict(self):
+        """Delete least-recently-used reports until the cache fits 90% of its budget."""
+        entries, total = [], 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pdf"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,53 @@
+"""
+Server-side retention of full analysis results.
+Each full_analysis() result is stored under its log id as zlib-compressed
+compact JSON, in the same transaction as the log row. Reports are then
+rendered from the stored result by id instead of from JSON posted back by
+the browser. Only the newest RESULT_RETENTION results are kept.
+"""
+import os
+import json
+import zlib
+
+RESULT_RETENTION = int(os.environ.get("FRAUDSHIELD_RESULT_RETENTION", 20000))
+PRUNE_EVERY      = 500   # ids between retention sweeps
+
+
+def init_result_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_results (
+            log_id  INTEGER PRIMARY KEY,
+            payload BLOB    NOT NULL
+        )
+    """)
+
+
+def encode_result(result):
+    raw = json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+
+def decode_result(payload):
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def store_result(cursor, log_id, result):
+    cursor.execute(
+        "INSERT OR REPLACE INTO analysis_results (log_id, payload) VALUES (?, ?)",
+        (log_id, encode_result(result)),
+    )
+    if log_id % PRUNE_EVERY == 0:
+        prune_results(cursor, log_id)
+
+
+def prune_results(cursor, newest_id):
+    """Drop results more than RESULT_RETENTION ids older than newest_id."""
+    cursor.execute("DELETE FROM analysis_results WHERE log_id <= ?",
+                   (newest_id - RESULT_RETENTION,))
+
+
+def load_result(cursor, log_id):
+    row = cursor.execute(
+        "SELECT payload FROM analysis_results WHERE log_id = ?", (log_id,)
+    ).fetchone()
+    return decode_result(row[0]) if row else None
@@ -0,0 +1,172 @@
+"""
+Time-bucketed rollups for dashboard trend charts.
+Per-minute and per-hour counters (by risk level, score sum and per flag)
+are upserted as each log is written, so a trend query reads only the
+buckets inside its window instead of grouping over analysis_logs.
+
+Bucket keys are wall-clock epoch seconds: analyzed_at is a naive local
+timestamp, and it is converted as if it were UTC so SQLite's
+strftime('%s', analyzed_at) and Python agree on the same key.
+"""
+import re
+import calendar
+from datetime import datetime, timezone
+
+MINUTE = 60
+HOUR   = 3600
+MAX_BUCKETS = 1440
+
+_LEVELS = ('HIGH', 'MEDIUM', 'LOW')
+_DURATION = re.compile(r'^(\d+)([smhd])$')
+_UNIT_SECONDS = {'s': 1, 'm': MINUTE, 'h': HOUR, 'd': 86400}
+
+
+def init_rollup_tables(cursor):
+    """Create rollup tables (called from database.init_db)."""
+    for grain in ('minute', 'hour'):
+        cursor.executescript(f"""
+            CREATE TABLE IF NOT EXISTS stats_{grain} (
+                bucket    INTEGER PRIMARY KEY,
+                total     INTEGER NOT NULL DEFAULT 0,
+                high      INTEGER NOT NULL DEFAULT 0,
+                medium    INTEGER NOT NULL DEFAULT 0,
+                low       INTEGER NOT NULL DEFAULT 0,
+                score_sum INTEGER NOT NULL DEFAULT 0,
+                unscored  INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS stats_{grain}_flags (
+                bucket INTEGER NOT NULL,
+                flag   TEXT    NOT NULL,
+                count  INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, flag)
+            ) WITHOUT ROWID;
+        """)
+        columns = {row[1] for row in cursor.execute(f"PRAGMA table_info(stats_{grain})")}
+        if "unscored" not in columns:
+            cursor.execute(f"ALTER TABLE stats_{grain} "
+                           "ADD COLUMN unscored INTEGER NOT NULL DEFAULT 0")
+
+
+def wall_epoch(dt):
+    """Naive local datetime → wall-clock epoch seconds."""
+    return calendar.timegm(dt.timetuple())
+
+
+def _bucket_label(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def record_rollup(cursor, analyzed_dt, risk_level, final_score, flags):
+    """
+    Add one analysis to its minute and hour buckets. A None final_score
+    (cascade rules-tier exit) is counted but kept out of the score average.
+    """
+    ts = wall_epoch(analyzed_dt)
+    level = {lvl: int(risk_level == lvl) for lvl in _LEVELS}
+    for grain, size in (('minute', MINUTE), ('hour', HOUR)):
+        bucket = ts - ts % size
+        cursor.execute(f"""
+            INSERT INTO stats_{grain} (bucket, total, high, medium, low, score_sum, unscored)
+            VALUES (?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (bucket) DO UPDATE SET
+                total     = total + 1,
+                high      = high + excluded.high,
+                medium    = medium + excluded.medium,
+                low       = low + excluded.low,
+                score_sum = score_sum + excluded.score_sum,
+                unscored  = unscored + excluded.unscored
+        """, (bucket, level['HIGH'], level['MEDIUM'], level['LOW'],
+              final_score or 0, int(final_score is None)))
+        if flags:
+            cursor.executemany(f"""
+                INSERT INTO stats_{grain}_flags (bucket, flag, count) VALUES (?, ?, 1)
+                ON CONFLICT (bucket, flag) DO UPDATE SET count = count + 1
+            """, [(bucket, flag) for flag in flags])
+
+
+def parse_duration(text):
+    """'24h' / '5m' / '7d' → seconds. Raises ValueError on bad input."""
+    m = _DURATION.match((text or '').strip().lower())
+    if not m or int(m.group(1)) == 0:
+        raise ValueError(f'Invalid duration: {text!r} (use e.g. 30m, 24h, 7d)')
+    return int(m.group(1)) * _UNIT_SECONDS[m.group(2)]
+
+
+def get_timeseries(cursor, window, bucket, now=None, include_flags=False):
+    """
+    Trend series for the last `window` seconds in `bucket`-second steps.
+    Reads the hour table when buckets are whole hours, else the minute table.
+    """
+    if bucket % MINUTE:
+        raise ValueError('bucket must be a whole number of minutes')
+    if window < bucket:
+        raise ValueError('window must be at least one bucket')
+    if window // bucket > MAX_BUCKETS:
+        raise ValueError(f'too many buckets (max {MAX_BUCKETS}); use a larger bucket')
+
+    now = wall_epoch(now or datetime.now())
+    end = now - now % bucket + bucket          # exclusive, includes current bucket
+    start = end - (window // bucket) * bucket
+    grain = 'hour' if bucket % HOUR == 0 else 'minute'
+
+    series = {
+        ts: {'start': _bucket_label(ts), 'total': 0, 'high': 0, 'medium': 0,
+             'low': 0, 'avg_score': 0, '_score_sum': 0, '_unscored': 0}
+        for ts in range(start, end, bucket)
+    }
+
+    cursor.execute(f"""
+        SELECT (bucket - ?) / ? * ? + ? AS slot,
+               SUM(total), SUM(high), SUM(medium), SUM(low), SUM(score_sum), SUM(unscored)
+        FROM stats_{grain}
+        WHERE bucket >= ? AND bucket < ?
+        GROUP BY slot
+    """, (start, bucket, bucket, start, start, end))
+    for slot, total, high, medium, low, score_sum, unscored in cursor.fetchall():
+        point = series[slot]
+        point.update(total=total, high=high, medium=medium, low=low,
+                     _score_sum=score_sum, _unscored=unscored)
+
+    if include_flags:
+        for point in series.values():
+            point['flags'] = {}
+        cursor.execute(f"""
+            SELECT (bucket - ?) / ? * ? + ? AS slot, flag, SUM(count)
+            FROM stats_{grain}_flags
+            WHERE bucket >= ? AND bucket < ?
+            GROUP BY slot, flag
+        """, (start, bucket, bucket, start, start, end))
+        for slot, flag, count in cursor.fetchall():
+            series[slot]['flags'][flag] = count
+
+    points = []
+    for ts in sorted(series):
+        point = series[ts]
+        score_sum = point.pop('_score_sum')
+        scored = point['total'] - point.pop('_unscored')
+        if scored:
+            point['avg_score'] = round(score_sum / scored, 1)
+        points.append(point)
+    return points
+
+
+def backfill_rollups(cursor, batch_size=5000):
+    """Rebuild rollups from analysis_logs (for logs written before rollups)."""
+    for grain in ('minute', 'hour'):
+        cursor.execute(f"DELETE FROM stats_{grain}")
+        cursor.execute(f"DELETE FROM stats_{grain}_flags")
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, analyzed_at, risk_level, final_score, flags FROM analysis_logs
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for _, analyzed_at, risk_level, final_score, flags in rows:
+            dt = datetime.strptime(analyzed_at, "%Y-%m-%d %H:%M:%S")
+            flag_list = [f.strip() for f in flags.split(', ') if f.strip()]
+            record_rollup(cursor, dt, risk_level, final_score, flag_list)
+        last_id = rows[-1][0]
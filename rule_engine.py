@@ -1,90 +1,79 @@
 import re
+import html
 
-FRAUD_PATTERNS = [
-    (r'\burgent\b', 'urgent'),
-    (r'\bimmediately\b', 'immediately'),
-    (r'\bact now\b', 'act now'),
-    (r'\botp\b', 'OTP'),
-    (r'\bkyc\b', 'KYC'),
-    (r'\bupdate\s+account\b', 'update account'),
-    (r'\bblocked\b', 'blocked'),
-    (r'\batm\b', 'ATM'),
-    (r'\bbank\b', 'bank'),
-    (r'\baadhaar\b', 'Aadhaar'),
-    (r'\bpan\b', 'PAN'),
-    (r'\bverify\b', 'verify'),
-    (r'\breward\b', 'reward'),
-    (r'\blottery\b', 'lottery'),
-    (r'\bclick here\b', 'click here'),
-    (r'\blimited period\b', 'limited period'),
-    (r'\bsuspicious\b', 'suspicious'),
-    (r'http[s]?://\S+', 'suspicious link'),
-    (r'\bwon\b', 'won'),
-    (r'\bprize\b', 'prize'),
-    (r'\bcongratulations\b', 'congratulations'),
-    (r'\bfree\b', 'free'),
-    (r'\bexpire[sd]?\b', 'expired'),
-    (r'\bpassword\b', 'password'),
-    (r'\bcredit card\b', 'credit card'),
-    (r'\bdebit card\b', 'debit card'),
-    (r'\baccount number\b', 'account number'),
-    (r'\bpin\b', 'PIN'),
-    (r'\bsuspend\b', 'suspend'),
-    (r'\bdeactivat\w*\b', 'deactivate'),
-    (r'\bclaim\b', 'claim'),
-    (r'\bcash\s*back\b', 'cash back'),
-    (r'\bunfreeze\b', 'unfreeze'),
-    (r'\bverification\b', 'verification'),
-    (r'\bexpiry\b', 'expiry'),
-]
-
-WEIGHT_MAP = {
-    'OTP': 10, 'KYC': 10, 'Aadhaar': 10, 'PAN': 10,
-    'suspicious link': 15, 'lottery': 10, 'prize': 8,
-    'won': 8, 'password': 10, 'credit card': 10,
-    'debit card': 10, 'PIN': 10, 'account number': 10,
-    'update account': 8, 'blocked': 7, 'urgent': 6,
-    'immediately': 6, 'act now': 7, 'verify': 5,
-    'reward': 5, 'congratulations': 5, 'free': 4,
-    'expired': 5, 'suspend': 7, 'deactivate': 7,
-    'claim': 5, 'bank': 4, 'ATM': 5, 'cash back': 4,
-    'unfreeze': 7, 'click here': 8, 'limited period': 6,
-    'suspicious': 5, 'verification': 5, 'expiry': 5,
-}
-
-
-def analyze_message(message):
-    text_lower = message.lower()
+from rule_packs import current_pack
+
+# Patterns and weights live in the rule pack (rules/default.json)
+_LINK_RE = re.compile(r'http[s]?://\S+', re.IGNORECASE)
+
+
+def analyze_message_spans(message, pack=None):
+    """
+    Like analyze_message, but also returns the (start, end, label)
+    character span of every match so callers can highlight without rescanning.
+    """
+    pack = pack or current_pack()
     detected = []
     detected_labels = set()
+    spans = []
+
+    for regex, label in pack.rule_patterns:
+        for m in regex.finditer(message):
+            spans.append((m.start(), m.end(), label))
+            if label not in detected_labels:
+                detected.append(label)
+                detected_labels.add(label)
+
+    return score_labels(detected, pack), detected, spans
+
+
+def score_labels(labels, pack=None):
+    """Rule score for a set of detected labels."""
+    pack = pack or current_pack()
+    raw_score = sum(pack.rule_weights.get(label, pack.default_weight) for label in labels)
+    return min(100, raw_score)
 
-    for pattern, label in FRAUD_PATTERNS:
-        matches = re.findall(pattern, text_lower, re.IGNORECASE)
-        if matches and label not in detected_labels:
-            detected.append(label)
-            detected_labels.add(label)
 
-    raw_score = sum(WEIGHT_MAP.get(label, 5) for label in detected)
-    rule_score = min(100, raw_score)
+def analyze_message(message, pack=None):
+    rule_score, detected, _ = analyze_message_spans(message, pack)
     return rule_score, detected
 
 
-def highlight_message(message, detected_phrases):
-    highlighted = message
-    sorted_phrases = sorted(detected_phrases, key=len, reverse=True)
+def merge_spans(spans):
+    """Sort spans and fuse overlapping/touching ones into (start, end) pairs."""
+    merged = []
+    for start, end, *_ in sorted(spans):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
 
-    for phrase in sorted_phrases:
+def highlight_spans(message, spans):
+    """Build escaped HTML with <mark> around each merged span, in one pass."""
+    parts = []
+    pos = 0
+    for start, end in merge_spans(spans):
+        parts.append(html.escape(message[pos:start]))
+        parts.append('<mark class="hl">')
+        parts.append(html.escape(message[start:end]))
+        parts.append('</mark>')
+        pos = end
+    parts.append(html.escape(message[pos:]))
+    return ''.join(parts)
+
+
+def highlight_message(message, detected_phrases):
+    """Highlight occurrences of already-detected phrases (escaped HTML)."""
+    spans = []
+    for phrase in detected_phrases:
         if phrase == 'suspicious link':
-            highlighted = re.sub(
-                r'(http[s]?://\S+)',
-                r'<mark class="hl">\1</mark>',
-                highlighted,
-                flags=re.IGNORECASE
-            )
+            regex = _LINK_RE
         else:
-            pattern = re.compile(re.escape(phrase), re.IGNORECASE)
-            highlighted = pattern.sub(
-                lambda m: f'<mark class="hl">{m.group(0)}</mark>',
-                highlighted
-            )
-    return highlighted
+            regex = re.compile(re.escape(phrase), re.IGNORECASE)
+        spans.extend((m.start(), m.end()) for m in regex.finditer(message))
+    return highlight_spans(message, spans)
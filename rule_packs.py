@@ -0,0 +1,195 @@
+"""
+Externalized, hot-reloadable rule packs.
+Fraud patterns, weights, multilingual phrases and URL lists live in a
+versioned JSON pack (rules/default.json) instead of Python literals. Each
+pack is compiled once into the matcher structures the engines use and the
+result is cached on disk under rules/.cache/, keyed by the pack's content
+hash, so workers that start on an unchanged pack skip parsing and
+validation.
+
+The active pack is a single module-level reference: reload() builds the
+new pack completely before swapping it in, so a request always sees one
+consistent pack. Callers grab current_pack() once per analysis and pass it
+down to every engine.
+"""
+import os
+import re
+import json
+import pickle
+import hashlib
+import threading
+
+from brand_index import BrandIndex
+
+RULES_PATH = os.environ.get(
+    "FRAUDSHIELD_RULES_PATH",
+    os.path.join(os.path.dirname(__file__), "rules", "default.json"),
+)
+CACHE_DIR = os.path.join(os.path.dirname(RULES_PATH), ".cache")
+CACHE_FORMAT = 4   # bump when RulePack's compiled layout changes
+
+
+class RulePackError(ValueError):
+    """The rule pack file is missing, malformed or contains a bad pattern."""
+
+
+class RulePack:
+    """Compiled, immutable view of one rule pack file."""
+
+    def __init__(self, data, content_hash):
+        try:
+            self.declared_version = str(data["version"])
+            self.content_hash = content_hash
+            self.version = f"{self.declared_version}+{content_hash[:8]}"
+
+            rules = data["rule_engine"]
+            self.default_weight = int(rules.get("default_weight", 5))
+            self.rule_patterns = [
+                (re.compile(pattern, re.IGNORECASE), label)
+                for pattern, label in rules["patterns"]
+            ]
+            self.rule_weights = {label: int(w) for label, w in rules["weights"].items()}
+
+            multi = data["multilingual"]
+            self.multi_cap = int(multi.get("score_cap", 50))
+            self.multi_scripts = {
+                lang: [(pattern, label, int(w)) for pattern, label, w in patterns]
+                for lang, patterns in multi["scripts"].items()
+            }
+            self.transliterated = [
+                (re.compile(re.escape(pattern), re.IGNORECASE), label, int(w))
+                for pattern, label, w in multi["transliterated"]
+            ]
+            self.multi_weights = {
+                label: w
+                for patterns in self.multi_scripts.values()
+                for _, label, w in patterns
+            }
+            self.multi_weights.update({label: w for _, label, w in self.transliterated})
+
+            urls = data["url_inspector"]
+            self.legit_domains = frozenset(d.lower() for d in urls["legit_domains"])
+            self.brand_keywords = tuple(urls["brand_keywords"])
+            self.suspicious_tlds = tuple(urls["suspicious_tlds"])
+            self.suspicious_path_patterns = tuple(urls["suspicious_path_patterns"])
+            self.shorteners = tuple(urls["shorteners"])
+            self.brand_index = BrandIndex(self.brand_keywords, self.legit_domains)
+        except re.error as e:
+            raise RulePackError(f"invalid pattern in rule pack: {e}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise RulePackError(f"malformed rule pack: {e!r}")
+
+    def is_legit_domain(self, domain):
+        return any(domain == d or domain.endswith('.' + d) for d in self.legit_domains)
+
+
+def _content_hash(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compile_pack(raw):
+    """Compile raw pack bytes, using the on-disk cache when it has this hash."""
+    content_hash = _content_hash(raw)
+    cache_path = os.path.join(CACHE_DIR, f"{content_hash}.v{CACHE_FORMAT}.pickle")
+    try:
+        with open(cache_path, "rb") as f:
+            pack = pickle.load(f)
+        if isinstance(pack, RulePack) and pack.content_hash == content_hash:
+            return pack
+    except (OSError, pickle.PickleError, EOFError, AttributeError):
+        pass
+
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise RulePackError(f"rule pack is not valid JSON: {e}")
+    pack = RulePack(data, content_hash)
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(pack, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # read-only deploys still work, just without the cache
+    return pack
+
+
+def load_pack(path=RULES_PATH):
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        raise RulePackError(f"cannot read rule pack {path}: {e}")
+    return compile_pack(raw)
+
+
+_current = None
+_current_mtime = None
+_failed_mtime = None
+_reload_lock = threading.Lock()
+
+
+def current_pack():
+    """The active rule pack (loaded on first use)."""
+    if _current is None:
+        reload()
+    return _current
+
+
+def reload(path=RULES_PATH):
+    """Load and atomically swap in the pack at `path`. Returns the active pack."""
+    global _current, _current_mtime
+    with _reload_lock:
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        pack = load_pack(path)
+        _current, _current_mtime = pack, mtime
+        return pack
+
+
+def install(raw, path=RULES_PATH):
+    """
+    Validate new pack bytes, write them over `path` atomically and activate
+    them here. Other workers pick the file up through their watchers.
+    """
+    compile_pack(raw)  # validate before touching the live file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)
+    return reload(path)
+
+
+def reload_if_changed(path=RULES_PATH):
+    """Reload when the file's mtime moved. Returns True if a new pack was loaded."""
+    global _failed_mtime
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+    if mtime in (_current_mtime, _failed_mtime):
+        return False
+    try:
+        reload(path)
+    except RulePackError:
+        _failed_mtime = mtime  # don't retry the same broken file every poll
+        raise
+    return True
+
+
+def start_watcher(interval=2.0, path=RULES_PATH, on_error=None):
+    """Poll the pack file in a daemon thread and hot-swap it on change."""
+    def watch():
+        stop = threading.Event()
+        while not stop.wait(interval):
+            try:
+                reload_if_changed(path)
+            except RulePackError as e:
+                # Keep serving the last good pack
+                if on_error:
+                    on_error(e)
+
+    thread = threading.Thread(target=watch, name="rule-pack-watcher", daemon=True)
+    thread.start()
+    return thread
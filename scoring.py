@@ -0,0 +1,314 @@
+"""
+Verdict arithmetic and the optional tiered scoring cascade.
+
+The final score is 0.6 × (rule + multilingual, capped at 100) + 0.4 × AI
+score, plus URL_BOOST when an inspected link scores URL_BOOST_MIN_RISK or
+more. In cascade mode the stages run cheapest first and stop as soon as
+the risk level can no longer change:
+
+    rules   rule engine + multilingual matcher; the AI score is assumed to
+            lie in FRAUDSHIELD_CASCADE_AI_RANGE
+    model   AI score known; only the URL boost is still open
+    urls    URL inspection ran (the full pipeline)
+
+A tier decides when the lowest and highest final score still possible fall
+in the same risk band. The boost is only possible when the text contains a
+link, so link-free messages never need the inspector. The default AI range
+("auto") is every score the model can produce for any input, derived from
+its weights (nlp_model.ai_score_bounds), so the cascade never changes a
+risk level; narrowing it lets the rules decide more often at the cost of
+agreement. When the rules decide, neither the AI score nor the final score
+is known: both are None and `cascade["score_range"]` gives the bounds.
+`python scoring.py` checks agreement on held-out messages (HOLDOUT_DATA,
+none of them in the training data) and that the default range can exit
+early.
+
+    FRAUDSHIELD_CASCADE            1 to enable (default off)
+    FRAUDSHIELD_CASCADE_AI_RANGE   assumed AI score range before the model runs,
+                                   "floor,ceiling" or "auto" (default)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+import rule_packs
+from rule_engine   import analyze_message_spans
+from nlp_model     import get_ai_score, ai_score_bounds
+from multilingual  import analyze_multilingual_spans
+from url_inspector import inspect_urls_in_message, extract_url_spans
+
+RULE_WEIGHT = 0.6
+AI_WEIGHT   = 0.4
+URL_BOOST          = 10
+URL_BOOST_MIN_RISK = 70
+TIERS = ("rules", "model", "urls")
+
+
+def get_risk_level(score):
+    if score <= 30:   return "LOW"
+    elif score <= 70: return "MEDIUM"
+    else:             return "HIGH"
+
+
+def weighted_score(combined_rule, ai_score):
+    return round(RULE_WEIGHT * combined_rule + AI_WEIGHT * ai_score)
+
+
+def url_boost(url_analysis):
+    """Score boost earned by the riskiest inspected URL."""
+    if url_analysis and max(u["risk_score"] for u in url_analysis) >= URL_BOOST_MIN_RISK:
+        return URL_BOOST
+    return 0
+
+
+def _rule_stage(message, pack):
+    rule_score, detected_phrases, rule_spans = analyze_message_spans(message, pack)
+    # Feature 4: Multilingual detection
+    multi_score, multilingual_flags, multi_spans = analyze_multilingual_spans(message, pack)
+    return {
+        "detected_phrases":   detected_phrases,
+        "rule_spans":         rule_spans,
+        "multilingual_flags": multilingual_flags,
+        "multi_spans":        multi_spans,
+        # Adjust rule score with multilingual bonus
+        "combined_rule":      min(100, rule_score + multi_score),
+    }
+
+
+def score_core(message, pack=None):
+    """Rule, AI and multilingual scores for one piece of text (no side effects)."""
+    core = _rule_stage(message, pack)
+    core["ai_score"] = get_ai_score(message)
+    core["final_score"] = weighted_score(core["combined_rule"], core["ai_score"])
+    return core
+
+
+def finish_verdict(core, text, pack=None):
+    """Add URL inspection and the final verdict to score_core()-shaped scores."""
+    url_spans = extract_url_spans(text)
+    # Feature 5: URL deep inspection
+    url_analysis = inspect_urls_in_message(text, url_spans, pack)
+    final_score = min(100, weighted_score(core["combined_rule"], core["ai_score"])
+                      + url_boost(url_analysis))
+    return dict(core, url_spans=url_spans, url_analysis=url_analysis,
+                final_score=final_score, risk_level=get_risk_level(final_score),
+                cascade=None)
+
+
+def full_verdict(message, pack=None):
+    return finish_verdict(score_core(message, pack), message, pack)
+
+
+class Cascade:
+    def __init__(self, enabled=False, ai_floor=0, ai_ceiling=100):
+        if not 0 <= ai_floor <= ai_ceiling <= 100:
+            raise ValueError("cascade AI range must satisfy 0 <= floor <= ceiling <= 100")
+        self.enabled = enabled
+        self.ai_floor = ai_floor
+        self.ai_ceiling = ai_ceiling
+        self._lock = threading.Lock()
+        self.decided = {tier: 0 for tier in TIERS}
+
+    @classmethod
+    def from_env(cls):
+        enabled = os.environ.get("FRAUDSHIELD_CASCADE") == "1"
+        if not enabled:
+            return cls()
+        floor, ceiling = parse_ai_range(os.environ.get("FRAUDSHIELD_CASCADE_AI_RANGE", "auto"))
+        return cls(enabled=True, ai_floor=floor, ai_ceiling=ceiling)
+
+    def verdict(self, message, pack=None):
+        """
+        Same shape as full_verdict(); `cascade` says which tier decided and
+        which stages were skipped. Skipped URL inspection leaves
+        url_analysis empty; a skipped model leaves ai_score and final_score
+        None, with the possible final scores in cascade["score_range"].
+        """
+        core = _rule_stage(message, pack)
+        url_spans = extract_url_spans(message)
+        boost = URL_BOOST if url_spans else 0
+        combined_rule = core["combined_rule"]
+
+        low = weighted_score(combined_rule, self.ai_floor)
+        high = min(100, weighted_score(combined_rule, self.ai_ceiling) + boost)
+        if get_risk_level(low) == get_risk_level(high):
+            # Band is settled but the score is not: report the bounds, not a guess
+            tier, ai_score, url_analysis, final_score = "rules", None, [], None
+            risk_level = get_risk_level(low)
+        else:
+            ai_score = get_ai_score(message)
+            final_score = weighted_score(combined_rule, ai_score)
+            if get_risk_level(final_score) == get_risk_level(min(100, final_score + boost)):
+                tier, url_analysis = "model", []
+            else:
+                tier = "urls"
+                url_analysis = inspect_urls_in_message(message, url_spans, pack)
+                final_score = min(100, final_score + url_boost(url_analysis))
+            risk_level = get_risk_level(final_score)
+
+        with self._lock:
+            self.decided[tier] += 1
+        cascade = {"tier": tier, "skipped": list(TIERS[TIERS.index(tier) + 1:])}
+        if tier == "rules":
+            cascade["score_range"] = [low, high]
+        return dict(core, ai_score=ai_score, url_spans=url_spans, url_analysis=url_analysis,
+                    final_score=final_score, risk_level=risk_level, cascade=cascade)
+
+    def stats(self):
+        with self._lock:
+            decided = dict(self.decided)
+        total = sum(decided.values())
+        return {
+            "enabled": self.enabled,
+            "ai_range": [self.ai_floor, self.ai_ceiling],
+            "decided": decided,
+            "decided_share": {t: round(n / total, 4) if total else 0.0
+                              for t, n in decided.items()},
+        }
+
+
+# Labelled messages the model was not trained on, for checking the cascade.
+# Includes keyword-stuffed text that pushes the AI score past anything in
+# TRAINING_DATA.
+HOLDOUT_DATA = [
+    ("click here to verify your account immediately otp kyc blocked pin password", 1),
+    ("Verify your KYC immediately, account blocked, share OTP and PIN now, urgent, lottery prize reward claim", 1),
+    ("Congratulations, you won a lottery prize. Share your card PIN to claim the reward.", 1),
+    ("Your SBI YONO account is suspended. Share the OTP you received to reactivate it today.", 1),
+    ("Dear customer, your electricity connection will be disconnected tonight. Call officer 9876543210 immediately.", 1),
+    ("Income tax refund of Rs 15,490 approved. Submit your bank account and PAN to receive it.", 1),
+    ("Your parcel is held at customs. Pay Rs 49 fee via UPI to release it.", 1),
+    ("Hello beta, I changed my number. Please send Rs 5000 urgently on this UPI id, will explain later.", 1),
+    ("Congratulations! Your number won KBC lottery Rs 25 lakh. Contact manager on WhatsApp to claim prize.", 1),
+    ("Your Paytm KYC expires today. Complete KYC or your wallet will be blocked.", 1),
+    ("Part time job offer: earn Rs 3000 daily liking videos. Reply YES to start.", 1),
+    ("Your credit card reward points worth Rs 7,850 expire today. Redeem now by updating card details.", 1),
+    ("Your debit card is blocked. Share PIN and OTP to unblock immediately.", 1),
+    ("You won a lottery cash prize! Send your bank account number and OTP to claim reward.", 1),
+    ("urgent urgent urgent otp otp otp", 1),
+    ("Kal office nahi aa raha, doctor appointment hai.", 0),
+    ("Your order #4521 has shipped and will arrive Tuesday.", 0),
+    ("Thanks for dinner yesterday, it was lovely.", 0),
+    ("Your OTP for Swiggy login is 552190. It is valid for 10 minutes.", 0),
+    ("Rs 1,200 debited from your account for electricity bill. Not you? Call the number on your card.", 0),
+    ("Reminder: parent teacher meeting on Saturday at 10am.", 0),
+    ("Your bank statement for March is ready in net banking.", 0),
+    ("Team, please review the deployment checklist before Friday.", 0),
+    ("Your gas cylinder booking is confirmed. Delivery within 2 days.", 0),
+    ("Happy Diwali to you and your family!", 0),
+    ("The library book you borrowed is due next week.", 0),
+    ("Your account password was changed. If this was you, ignore this message.", 0),
+]
+
+
+def labelled_corpus(path=None):
+    """[(message, label)] from HOLDOUT_DATA, plus a JSONL file of {"message", "label"}."""
+    pairs = list(HOLDOUT_DATA)
+    # Any message carrying a phishing link counts as fraud; exercises the URL tier
+    pairs += [(msg + " http://kyc-verify-now.xyz/login", 1) for msg, _ in HOLDOUT_DATA]
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    pairs.append((row["message"], int(row["label"])))
+    return pairs
+
+
+def parse_ai_range(text):
+    """(floor, ceiling) from "floor,ceiling", or the model's reachable range for "auto"."""
+    if text.strip() == "auto":
+        return ai_score_bounds()
+    floor, ceiling = text.split(",")
+    return int(floor), int(ceiling)
+
+
+def check_early_exit(pairs=None):
+    """
+    Share of the labelled corpus the rules tier decides with the default
+    ("auto") range. Raises AssertionError if it never decides, or if an
+    early exit reports a score or a risk level the full pipeline disagrees
+    with.
+    """
+    pairs = pairs or labelled_corpus()
+    cascade = Cascade(True, *ai_score_bounds())
+    pack = rule_packs.current_pack()
+    early = 0
+    for message, _ in pairs:
+        result = cascade.verdict(message, pack)
+        if result["cascade"]["tier"] != "rules":
+            continue
+        early += 1
+        if result["ai_score"] is not None or result["final_score"] is not None:
+            raise AssertionError(f"early exit reported a score it never computed: {message!r}")
+        expected = full_verdict(message, pack)
+        low, high = result["cascade"]["score_range"]
+        if result["risk_level"] != expected["risk_level"] or not low <= expected["final_score"] <= high:
+            raise AssertionError(f"early exit disagrees with the full pipeline: {message!r}")
+    if not early:
+        raise AssertionError(f"rules tier decided none of {len(pairs)} messages "
+                             f"with the default AI range {cascade.ai_floor},{cascade.ai_ceiling}")
+    return early / len(pairs)
+
+
+def check_agreement(cascade, pairs):
+    """Compare cascade and full-pipeline risk levels over labelled pairs."""
+    pack = rule_packs.current_pack()
+    agree = {tier: [0, 0] for tier in TIERS}   # tier -> [agreed, decided]
+    detected = {"full": 0, "cascade": 0}
+    full_s = cascade_s = 0.0
+    for message, label in pairs:
+        start = time.perf_counter()
+        expected = full_verdict(message, pack)["risk_level"]
+        full_s += time.perf_counter() - start
+        start = time.perf_counter()
+        result = cascade.verdict(message, pack)
+        cascade_s += time.perf_counter() - start
+
+        counts = agree[result["cascade"]["tier"]]
+        counts[0] += result["risk_level"] == expected
+        counts[1] += 1
+        detected["full"] += label == 1 and expected != "LOW"
+        detected["cascade"] += label == 1 and result["risk_level"] != "LOW"
+    frauds = sum(label for _, label in pairs) or 1
+    return {
+        "messages":   len(pairs),
+        "agreement":  sum(a for a, _ in agree.values()) / len(pairs),
+        "tiers":      agree,
+        "recall":     {k: v / frauds for k, v in detected.items()},
+        "full_us":    full_s / len(pairs) * 1e6,
+        "cascade_us": cascade_s / len(pairs) * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that the scoring cascade agrees with the full pipeline.")
+    parser.add_argument("--ai-range", default=os.environ.get("FRAUDSHIELD_CASCADE_AI_RANGE", "auto"),
+                        help="assumed AI score range before the model runs, e.g. 10,75 (default auto)")
+    parser.add_argument("--corpus", help="extra labelled JSONL ({\"message\", \"label\"} per line)")
+    parser.add_argument("--min-agreement", type=float, default=1.0,
+                        help="exit non-zero below this agreement (default 1.0)")
+    args = parser.parse_args()
+
+    pairs = labelled_corpus(args.corpus)
+    floor, ceiling = parse_ai_range(args.ai_range)
+    report = check_agreement(Cascade(True, floor, ceiling), pairs)
+    print(f"{report['messages']} messages, AI range {floor},{ceiling}")
+    for tier, (agreed, decided) in report["tiers"].items():
+        share = decided / report["messages"]
+        rate = f"{agreed / decided:.1%} agree" if decided else "-"
+        print(f"  {tier:6} decided {decided:5} ({share:6.1%})  {rate}")
+    print(f"Agreement {report['agreement']:.2%}; fraud recall full {report['recall']['full']:.1%}, "
+          f"cascade {report['recall']['cascade']:.1%}")
+    print(f"Full pipeline {report['full_us']:.0f} µs/msg, cascade {report['cascade_us']:.0f} µs/msg")
+    try:
+        share = check_early_exit(pairs)
+        print(f"Early exit with the default range: OK ({share:.1%} decided by rules)")
+    except AssertionError as e:
+        print(f"Early exit with the default range: FAIL ({e})")
+        sys.exit(1)
+    sys.exit(0 if report["agreement"] >= args.min_agreement else 1)
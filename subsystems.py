@@ -0,0 +1,37 @@
+"""
+Lazy facade over the heavy subsystems.
+OCR (pytesseract + Pillow), PDF rendering (reportlab) and explainability
+(the fitted sklearn pipeline) are imported on first use instead of at app
+import, so workers, CLI tools and anything else that imports `app` boot
+without paying for libraries most requests never touch.
+
+Explanations for concurrent requests go through a micro-batcher, so
+threaded workers share one vectorizer call (see microbatch.py).
+"""
+from microbatch import MicroBatcher
+
+
+def extract_text_from_image(image_bytes):
+    """Feature 2: OCR — see ocr_scanner.extract_text_from_image."""
+    from ocr_scanner import extract_text_from_image as _extract
+    return _extract(image_bytes)
+
+
+def generate_pdf_report(result):
+    """Feature 7: PDF report — see pdf_report.generate_pdf_report."""
+    from pdf_report import generate_pdf_report as _generate
+    return _generate(result)
+
+
+def _explain_batch(messages):
+    from explainability import get_ai_explanations
+    from nlp_model import get_pipeline
+    return get_ai_explanations(messages, get_pipeline())
+
+
+explain_batcher = MicroBatcher.from_env(_explain_batch)
+
+
+def get_ai_explanation(message):
+    """Feature 8: XAI breakdown for the shared model pipeline."""
+    return explain_batcher.submit(message)
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app is a flat set of modules at the repo root, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def flask_app():
+    os.environ.setdefault("FRAUDSHIELD_REPORT_CACHE_DIR", tempfile.mkdtemp(prefix="fs-reports-"))
+    from app import app
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
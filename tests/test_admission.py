@@ -0,0 +1,40 @@
+import io
+
+from flask import Flask
+
+from admission import DEGRADED, FULL, IMAGE, TEXT, AdmissionController, route_class
+
+
+def test_slow_ocr_does_not_degrade_text():
+    ctl = AdmissionController(latency_slo_ms=400, ocr_slo_ms=4000)
+    for _ in range(20):
+        ctl.observe(3000, FULL, IMAGE)
+    assert ctl.admit(TEXT) == FULL
+    assert ctl.admit(IMAGE) == FULL
+    for _ in range(20):
+        ctl.observe(6000, FULL, IMAGE)
+    assert ctl.admit(IMAGE) == DEGRADED
+    assert ctl.admit(TEXT) == FULL
+
+
+def test_streams_do_not_hold_in_flight_slots():
+    ctl = AdmissionController(max_in_flight=2, degrade_in_flight=2, max_streams=2)
+    assert ctl.admit_stream() == FULL and ctl.admit_stream() == FULL
+    assert ctl.admit_stream() is None
+    assert ctl.in_flight == 0
+    assert ctl.admit() == FULL
+    ctl.release_stream()
+    assert ctl.admit_stream() == FULL
+    assert ctl.stats()["streams"] == 2
+
+
+def test_route_class_detects_uploads():
+    app = Flask(__name__)
+    with app.test_request_context("/", method="POST", data={"message": "hi"}):
+        assert route_class() == TEXT
+    with app.test_request_context("/", method="POST", content_type="multipart/form-data",
+                                  data={"screenshot": (io.BytesIO(b"png"), "shot.png")}):
+        assert route_class() == IMAGE
+    with app.test_request_context("/", method="POST", content_type="multipart/form-data",
+                                  data={"message": "hi"}):
+        assert route_class() == TEXT
@@ -0,0 +1,46 @@
+import pytest
+
+from app import DEFAULT_API_FIELDS, RESULT_FIELDS
+
+MESSAGE = "Dear customer, your account is blocked. Share the OTP to verify."
+
+
+def test_default_fields(client):
+    resp = client.post("/api/analyze", json={"message": MESSAGE})
+    assert resp.status_code == 200
+    assert set(resp.get_json()) == set(DEFAULT_API_FIELDS)
+
+
+def test_requested_fields_from_body_and_query(client):
+    resp = client.post("/api/analyze", json={"message": MESSAGE, "fields": ["rule_score"]})
+    assert set(resp.get_json()) == {"rule_score"}
+    resp = client.post("/api/analyze?fields=risk_level, ai_score", json={"message": MESSAGE})
+    assert set(resp.get_json()) == {"risk_level", "ai_score"}
+
+
+@pytest.mark.parametrize("fields", ["final_score", [], {"final_score": 1}, [1], [None],
+                                    ["final_score", ["risk_level"]]])
+def test_malformed_fields_are_rejected(client, fields):
+    resp = client.post("/api/analyze", json={"message": MESSAGE, "fields": fields})
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert "'fields'" in body["error"] and body["available"] == RESULT_FIELDS
+
+
+@pytest.mark.parametrize("query", ["", ",", " , "])
+def test_empty_query_fields_are_rejected(client, query):
+    resp = client.post(f"/api/analyze?fields={query}", json={"message": MESSAGE})
+    assert resp.status_code == 400
+
+
+def test_unknown_fields_are_named(client):
+    resp = client.post("/api/analyze", json={"message": MESSAGE,
+                                             "fields": ["risk_level", "password", "x"]})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "unknown fields: password, x"
+
+
+@pytest.mark.parametrize("payload", [None, {"message": ""}, {"message": 5}, ["message"]])
+def test_message_is_required(client, payload):
+    resp = client.post("/api/analyze", json=payload)
+    assert resp.status_code == 400
@@ -0,0 +1,49 @@
+import pytest
+
+import rule_packs
+from brand_index import (BENIGN_DOMAINS, LOOKALIKE_DOMAINS, BrandIndex, check_domains,
+                         max_distance)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return rule_packs.current_pack().brand_index
+
+
+def test_current_pack_passes_regression_lists(index):
+    check_domains(index)
+
+
+@pytest.mark.parametrize("domain", BENIGN_DOMAINS)
+def test_benign_domain_is_not_a_lookalike(index, domain):
+    assert index.lookalike(domain) is None
+
+
+@pytest.mark.parametrize("domain", ["onlinesale.in", "onlineseo.com", "onlinesms.in",
+                                    "onlineset.com", "onlinesql.com"])
+def test_shared_generic_prefix_is_not_enough(index, domain):
+    assert index.lookalike(domain) is None
+
+
+@pytest.mark.parametrize("domain,brand", LOOKALIKE_DOMAINS)
+def test_impersonation_is_caught(index, domain, brand):
+    match = index.lookalike(domain)
+    assert index.exact_brand(domain) is not None or (match and match[0] == brand)
+
+
+def test_edit_allowance_by_length():
+    assert [max_distance(n) for n in (3, 6, 7, 10, 11, 16)] == [0, 0, 1, 1, 2, 2]
+
+
+def test_two_edits_only_for_long_names():
+    index = BrandIndex(["hdfcbank", "kotakmahindra"])
+    assert index.lookalike("hdfcbnk.in")[0] == "hdfcbank"
+    assert index.lookalike("hdfbnk.in") is None                  # two edits, 8 letters
+    assert index.lookalike("kotakmahndr.in")[0] == "kotakmahindra"
+
+
+def test_generic_prefix_rest_is_compared_alone():
+    index = BrandIndex(["onlinesbi", "bankofbaroda"])
+    assert index.lookalike("onlinesbl.com")[0] == "onlinesbi"    # homoglyph, distance 0
+    assert index.lookalike("onlinesbx.com") is None              # one edit to "sbi"
+    assert index.lookalike("bankofbarodda.in")[0] == "bankofbaroda"
@@ -0,0 +1,63 @@
+import pytest
+
+from nlp_model import ai_score_bounds, get_ai_score
+from scoring import (Cascade, HOLDOUT_DATA, check_early_exit, full_verdict, get_risk_level,
+                     parse_ai_range)
+
+ADVERSARIAL = "click here to verify your account immediately otp kyc blocked pin password"
+RULES_EXIT = "Congratulations, you won a lottery prize. Share your card PIN to claim the reward."
+
+
+@pytest.fixture(scope="module")
+def cascade():
+    return Cascade(True, *ai_score_bounds())
+
+
+def test_auto_range_is_the_models_reachable_range():
+    low, high = ai_score_bounds()
+    assert parse_ai_range("auto") == (low, high)
+    assert 0 <= low < high <= 100
+    for message, _ in HOLDOUT_DATA:
+        assert low <= get_ai_score(message) <= high
+
+
+@pytest.mark.parametrize("message", [ADVERSARIAL, RULES_EXIT] + [m for m, _ in HOLDOUT_DATA])
+def test_cascade_matches_full_pipeline(cascade, message):
+    assert cascade.verdict(message)["risk_level"] == full_verdict(message)["risk_level"]
+
+
+def test_adversarial_message_reaches_high(cascade):
+    verdict = cascade.verdict(ADVERSARIAL)
+    assert verdict["risk_level"] == "HIGH"
+    assert verdict["cascade"]["tier"] != "rules"
+
+
+def test_rules_exit_reports_range_not_score(cascade):
+    verdict = cascade.verdict(RULES_EXIT)
+    assert verdict["cascade"] == {"tier": "rules", "skipped": ["model", "urls"],
+                                  "score_range": verdict["cascade"]["score_range"]}
+    assert verdict["ai_score"] is None and verdict["final_score"] is None
+    low, high = verdict["cascade"]["score_range"]
+    assert get_risk_level(low) == get_risk_level(high) == verdict["risk_level"]
+    assert low <= full_verdict(RULES_EXIT)["final_score"] <= high
+
+
+def test_link_keeps_band_open(cascade):
+    verdict = cascade.verdict(RULES_EXIT + " http://kyc-verify-now.xyz/login")
+    assert verdict["cascade"]["tier"] != "rules"
+    assert verdict["final_score"] is not None
+
+
+def test_full_range_never_exits_on_rules():
+    wide = Cascade(True, 0, 100)
+    assert all(wide.verdict(m)["cascade"]["tier"] != "rules" for m, _ in HOLDOUT_DATA)
+
+
+def test_early_exit_check_passes():
+    assert 0 < check_early_exit() < 1
+
+
+@pytest.mark.parametrize("text", ["", "50", "60,40", "0,101", "a,b"])
+def test_bad_ai_range_is_rejected(text):
+    with pytest.raises(ValueError):
+        Cascade(True, *parse_ai_range(text))
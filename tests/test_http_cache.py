@@ -0,0 +1,65 @@
+import pytest
+from flask import Flask
+
+from http_cache import REVALIDATE, SHARED_SHORT, conditional_get
+
+
+@pytest.fixture
+def toy():
+    app = Flask(__name__)
+    state = {"version": "v1", "renders": 0}
+
+    @app.route("/page", methods=["GET", "POST"])
+    @conditional_get(lambda: state["version"], SHARED_SHORT)
+    def page():
+        state["renders"] += 1
+        return "body"
+
+    @app.route("/missing")
+    @conditional_get(lambda: state["version"])
+    def missing():
+        return "nope", 404
+
+    return app.test_client(), state
+
+
+def test_matching_etag_skips_the_view(toy):
+    client, state = toy
+    first = client.get("/page")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == SHARED_SHORT
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"v1"')
+
+    again = client.get("/page", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == etag
+    assert state["renders"] == 1
+
+
+def test_new_version_renders_again(toy):
+    client, state = toy
+    etag = client.get("/page").headers["ETag"]
+    state["version"] = "v2"
+    resp = client.get("/page", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and 'W/"v2"' in resp.headers["ETag"]
+    assert state["renders"] == 2
+
+
+def test_other_methods_and_errors_are_not_cached(toy):
+    client, _ = toy
+    resp = client.post("/page", headers={"If-None-Match": 'W/"v1"'})
+    assert resp.status_code == 200 and "ETag" not in resp.headers
+    resp = client.get("/missing")
+    assert resp.status_code == 404 and "ETag" not in resp.headers
+
+
+@pytest.mark.parametrize("path,cache_control", [
+    ("/api/stats", SHARED_SHORT), ("/logs", REVALIDATE), ("/dashboard", REVALIDATE),
+    ("/community", SHARED_SHORT),
+])
+def test_app_pages_revalidate_with_304(client, path, cache_control):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == cache_control
+    resp = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
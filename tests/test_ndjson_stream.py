@@ -0,0 +1,61 @@
+import io
+import json
+
+from ndjson_stream import MAX_LINE_BYTES, stream_results
+
+
+def _run(body, analyze=lambda message: {"risk_level": "LOW"}):
+    return [json.loads(line) for line in stream_results(io.BytesIO(body), analyze)]
+
+
+def test_each_bad_line_gets_its_own_error():
+    body = b"\n".join([
+        json.dumps({"message": "first", "id": "a"}).encode(),
+        b"{not json",
+        json.dumps({"id": "c"}).encode(),
+        json.dumps("bare string").encode(),
+        b"\xff\xfe",
+        json.dumps({"message": "   ", "id": 7}).encode(),
+    ]) + b"\n"
+    out = _run(body)
+    assert out[0] == {"line": 1, "id": "a", "risk_level": "LOW"}
+    assert out[1]["line"] == 2 and out[1]["error"].startswith("invalid JSON")
+    assert out[2] == {"line": 3, "id": "c", "error": 'expected a non-empty "message" string'}
+    assert out[3] == {"line": 4, "risk_level": "LOW"}
+    assert out[4] == {"line": 5, "error": "line is not valid UTF-8"}
+    assert out[5]["id"] == 7 and "error" in out[5]
+    assert out[-1] == {"done": True, "lines": 6, "errors": 4}
+
+
+def test_oversized_line_is_skipped_not_buffered():
+    body = b'"' + b"x" * (MAX_LINE_BYTES * 3) + b'"\n"after"\n'
+    out = _run(body)
+    assert out[0] == {"line": 1, "error": f"line exceeds {MAX_LINE_BYTES} bytes"}
+    assert out[1] == {"line": 2, "risk_level": "LOW"}
+    assert out[-1]["errors"] == 1
+
+
+def test_blank_lines_are_keepalives():
+    out = _run(b'\n\n"one"\n  \n"two"')
+    assert [o.get("line") for o in out[:-1]] == [1, 2]
+    assert out[-1] == {"done": True, "lines": 2, "errors": 0}
+
+
+def test_analyzer_failure_is_reported_per_line():
+    def analyze(message):
+        if message == "boom":
+            raise RuntimeError("internal detail")
+        return {"risk_level": "LOW"}
+    out = _run(b'"boom"\n"fine"\n', analyze)
+    assert out[0] == {"line": 1, "error": "internal error while analyzing this line"}
+    assert out[1] == {"line": 2, "risk_level": "LOW"}
+
+
+def test_stream_endpoint_reports_errors_inline(client):
+    body = b'{"message": "Your KYC is blocked, share OTP", "id": "ok"}\n{oops\n'
+    resp = client.post("/api/stream", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 200
+    out = [json.loads(line) for line in resp.data.splitlines()]
+    assert out[0]["id"] == "ok" and out[0]["risk_level"] in ("LOW", "MEDIUM", "HIGH")
+    assert out[1]["line"] == 2 and "error" in out[1]
+    assert out[2] == {"done": True, "lines": 2, "errors": 1}
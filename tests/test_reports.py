@@ -0,0 +1,54 @@
+import pytest
+
+from app import report_cache
+
+MESSAGE = "URGENT: your KYC is blocked, share the OTP at http://kyc-verify-now.xyz/login"
+
+
+@pytest.fixture
+def token(client):
+    resp = client.post("/api/analyze", json={"message": MESSAGE, "fields": ["report_token"]})
+    assert resp.status_code == 200
+    return resp.get_json()["report_token"]
+
+
+def test_token_round_trip(token):
+    log_id = report_cache.log_id_for(token)
+    assert log_id is not None
+    assert report_cache.token_for(log_id) == token
+
+
+def test_report_is_served_for_a_valid_token(client, token):
+    resp = client.get(f"/report/{token}.pdf")
+    assert resp.status_code in (200, 503)   # 503 while the first render is in flight
+    if resp.status_code == 200:
+        assert resp.mimetype == "application/pdf"
+
+
+def _tampered(token):
+    log_id, mac = token.split("-", 1)
+    return [
+        f"{log_id}-{'0' * len(mac)}",                       # forged signature
+        f"{int(log_id) + 1}-{mac}",                         # signature of another id
+        f"{log_id}-{mac[:-1]}",                             # truncated
+        f"{log_id}-{mac.upper()}",                          # not the canonical form
+        log_id,                                             # bare id
+        f"x{log_id}-{mac}",
+        "",
+    ]
+
+
+def test_tampered_tokens_are_rejected(token):
+    for bad in _tampered(token):
+        assert report_cache.log_id_for(bad) is None, bad
+
+
+def test_tampered_tokens_get_404(client, token):
+    for bad in _tampered(token):
+        if bad:
+            assert client.get(f"/report/{bad}.pdf").status_code == 404, bad
+
+
+def test_client_supplied_results_are_not_rendered(client):
+    resp = client.post("/download-report", data={"result_data": '{"risk_level": "LOW"}'})
+    assert resp.status_code in (404, 405)
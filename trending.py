@@ -0,0 +1,151 @@
+"""
+Trending scam indicators.
+Phone numbers, UPI handles and link domains are pulled out of every
+analyzed message and fed into streaming heavy-hitter sketches: a
+Count-Min sketch plus a bounded top-k candidate set per time bucket, kept
+in ring buffers of 12 × 5-minute buckets (last hour) and 24 × 1-hour
+buckets (last day). A query sums a fixed number of fixed-size sketches,
+so time and memory stay constant however many distinct values appear.
+
+Counts are estimates (Count-Min never under-counts) and are per worker
+process; with N workers behind a balancer each sees about 1/N of traffic,
+which preserves the ranking. /api/trending marks its output with
+"scope": "worker" for that reason. A worker's startup replay reads the
+shared log up to the last id logged before it started, so counts from
+before a restart cover every worker's traffic and later ones only its own.
+"""
+import re
+import hashlib
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from url_inspector import extract_urls
+
+KINDS = ("phone", "upi", "domain")
+CMS_DEPTH = 4
+CMS_WIDTH = 1024
+TOP_K     = 64          # candidates tracked per kind per bucket
+
+WINDOWS = {
+    # name: (bucket seconds, bucket count)
+    "1h":  (300, 12),
+    "24h": (3600, 24),
+}
+
+# Indian mobile numbers, with or without +91 / 0 prefix and separators
+PHONE_RE = re.compile(r'(?<![\d+])(?:\+?91[\s\-]?|0)?([6-9]\d{4})[\s\-]?(\d{5})(?!\d)')
+# name@psp with no dot after the handle (which would make it an e-mail)
+UPI_RE = re.compile(r'(?<![\w.\-])([a-zA-Z0-9][\w.\-]{1,63}@[a-zA-Z]{2,32})(?![\w.@\-])')
+
+
+def extract_indicators(text, url_analysis=None, pack=None):
+    """
+    [(kind, value)] found in `text`. Domains come from `url_analysis`
+    (inspect_urls_in_message output) when given; verified legitimate
+    domains are never counted.
+    """
+    found = [("phone", a + b) for a, b in PHONE_RE.findall(text)]
+    found += [("upi", handle.lower()) for handle in UPI_RE.findall(text)]
+
+    if url_analysis is not None:
+        domains = [u["domain"] for u in url_analysis if u.get("risk_level") != "SAFE"]
+    else:
+        domains = []
+        for url in extract_urls(text):
+            domain = urlparse(url).netloc.lower().replace("www.", "")
+            if domain and not (pack and pack.is_legit_domain(domain)):
+                domains.append(domain)
+    found += [("domain", d) for d in domains if d]
+    return found
+
+
+def _hash_indexes(value):
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=4 * CMS_DEPTH).digest()
+    return np.frombuffer(digest, dtype=np.uint32) % CMS_WIDTH
+
+
+class _Bucket:
+    __slots__ = ("index", "cms", "candidates")
+
+    def __init__(self, index):
+        self.index = index
+        self.cms = np.zeros((CMS_DEPTH, CMS_WIDTH), dtype=np.uint32)
+        self.candidates = {}
+
+    def add(self, value):
+        rows = np.arange(CMS_DEPTH)
+        cols = _hash_indexes(value)
+        self.cms[rows, cols] += 1
+        estimate = int(self.cms[rows, cols].min())
+        if value in self.candidates or len(self.candidates) < TOP_K:
+            self.candidates[value] = estimate
+            return
+        weakest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[weakest]:
+            del self.candidates[weakest]
+            self.candidates[value] = estimate
+
+
+class SlidingHeavyHitters:
+    """Heavy hitters over the last `count` buckets of `bucket_seconds` each."""
+
+    def __init__(self, bucket_seconds, count):
+        self.bucket_seconds = bucket_seconds
+        self.count = count
+        self.ring = [None] * count
+
+    def _bucket(self, now):
+        index = int(now // self.bucket_seconds)
+        slot = index % self.count
+        bucket = self.ring[slot]
+        if bucket is not None and bucket.index > index:
+            return None   # older than the whole window
+        if bucket is None or bucket.index != index:
+            bucket = self.ring[slot] = _Bucket(index)
+        return bucket
+
+    def add(self, value, now):
+        bucket = self._bucket(now)
+        if bucket is not None:
+            bucket.add(value)
+
+    def top(self, n, now):
+        current = int(now // self.bucket_seconds)
+        live = [b for b in self.ring if b is not None and current - b.index < self.count]
+        if not live:
+            return []
+        cms = np.sum([b.cms for b in live], axis=0, dtype=np.uint64)
+        rows = np.arange(CMS_DEPTH)
+        candidates = set().union(*(b.candidates for b in live))
+        scored = [(int(cms[rows, _hash_indexes(v)].min()), v) for v in candidates]
+        scored.sort(reverse=True)
+        return [{"value": v, "count": c} for c, v in scored[:n]]
+
+
+class TrendingIndicators:
+    def __init__(self, windows=WINDOWS):
+        self._lock = threading.Lock()
+        self.sketches = {
+            (kind, name): SlidingHeavyHitters(seconds, count)
+            for kind in KINDS
+            for name, (seconds, count) in windows.items()
+        }
+        self.windows = list(windows)
+
+    def observe(self, indicators, now=None):
+        """Count one message's indicators (each distinct value once per message)."""
+        if not indicators:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            for kind, value in set(indicators):
+                for name in self.windows:
+                    self.sketches[(kind, name)].add(value, now)
+
+    def top(self, window="1h", kinds=KINDS, limit=10, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return {kind: self.sketches[(kind, window)].top(limit, now) for kind in kinds}
@@ -7,49 +7,32 @@ import re
 from urllib.parse import urlparse
 
 
-# Known legitimate domains (whitelist)
-LEGIT_DOMAINS = {
-    'sbi.co.in', 'onlinesbi.com', 'hdfcbank.com', 'icicibank.com',
-    'axisbank.com', 'kotak.com', 'pnbindia.in', 'bankofbaroda.in',
-    'irctc.co.in', 'incometax.gov.in', 'uidai.gov.in', 'npci.org.in',
-    'paytm.com', 'phonepe.com', 'gpay.app', 'amazon.in', 'flipkart.com',
-    'gov.in', 'nic.in', 'india.gov.in', 'rbi.org.in', 'sebi.gov.in',
-    'jio.com', 'airtel.in', 'bsnl.in', 'vi.in',
-}
-
-# Brands commonly impersonated
-BRAND_KEYWORDS = [
-    'sbi', 'hdfc', 'icici', 'axis', 'kotak', 'pnb', 'bob', 'canara',
-    'irctc', 'uidai', 'aadhaar', 'income', 'tax', 'paytm', 'phonepe',
-    'amazon', 'flipkart', 'jio', 'airtel', 'npci', 'rbi', 'sebi',
-]
-
-# Suspicious TLDs
-SUSPICIOUS_TLDS = [
-    '.xyz', '.tk', '.ml', '.ga', '.cf', '.gq', '.pw', '.top',
-    '.club', '.site', '.online', '.click', '.link', '.work',
-    '.loan', '.win', '.party', '.stream', '.download',
-]
-
-# Suspicious patterns in URL paths
-SUSPICIOUS_PATH_PATTERNS = [
-    'verify', 'update', 'confirm', 'secure', 'login', 'signin',
-    'account', 'kyc', 'otp', 'claim', 'reward', 'prize', 'free',
-    'winner', 'lucky', 'offer', 'cash', 'refund', 'block', 'suspend',
-]
+from rule_packs import current_pack
+
+# Whitelist, impersonated brands, suspicious TLDs / path keywords and URL
+# shorteners live in the rule pack (rules/default.json, "url_inspector").
+# Brand names are looked up through the pack's BrandIndex (brand_index.py).
+
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+', re.IGNORECASE)
+
+
+def extract_url_spans(text):
+    """Extract all URLs from text as (start, end, url) spans."""
+    return [(m.start(), m.end(), m.group(0)) for m in URL_PATTERN.finditer(text)]
 
 
 def extract_urls(text):
     """Extract all URLs from text."""
-    pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-    return re.findall(pattern, text, re.IGNORECASE)
+    return [url for _, _, url in extract_url_spans(text)]
 
 
-def analyze_url(url):
+def analyze_url(url, pack=None):
     """
     Deep heuristic analysis of a single URL.
     Returns a dict with findings.
     """
+    pack = pack or current_pack()
     findings = []
     risk_score = 0
 
@@ -60,7 +43,7 @@ def analyze_url(url):
         full = url.lower()
 
         # 1. Check whitelist
-        if any(domain == d or domain.endswith('.' + d) for d in LEGIT_DOMAINS):
+        if pack.is_legit_domain(domain):
             return {
                 'url': url,
                 'domain': domain,
@@ -76,18 +59,23 @@ def analyze_url(url):
             risk_score += 15
 
         # 3. Suspicious TLD
-        for tld in SUSPICIOUS_TLDS:
+        for tld in pack.suspicious_tlds:
             if domain.endswith(tld):
                 findings.append(f'Suspicious top-level domain: {tld}')
                 risk_score += 20
                 break
 
-        # 4. Brand impersonation in domain
-        for brand in BRAND_KEYWORDS:
-            if brand in domain and not any(domain == d or domain.endswith('.' + d) for d in LEGIT_DOMAINS):
-                findings.append(f'Impersonates "{brand.upper()}" brand in domain name')
-                risk_score += 25
-                break
+        # 4. Brand impersonation in domain: the name itself, else a lookalike spelling
+        brand = pack.brand_index.exact_brand(domain)
+        lookalike = None if brand else pack.brand_index.lookalike(domain)
+        if lookalike and lookalike[0] == lookalike[1]:
+            brand = lookalike[0]
+        if brand:
+            findings.append(f'Impersonates "{brand.upper()}" brand in domain name')
+            risk_score += 25
+        elif lookalike:
+            findings.append(f'Lookalike of "{lookalike[0].upper()}" in domain name: "{lookalike[1]}"')
+            risk_score += 25
 
         # 5. Typosquatting patterns (hyphens in domain = red flag)
         hyphen_count = domain.split('.')[0].count('-')
@@ -99,7 +87,7 @@ def analyze_url(url):
             risk_score += 8
 
         # 6. Suspicious path keywords
-        matched_paths = [p for p in SUSPICIOUS_PATH_PATTERNS if p in path]
+        matched_paths = [p for p in pack.suspicious_path_patterns if p in path]
         if matched_paths:
             findings.append(f'Suspicious path keywords: {", ".join(matched_paths[:3])}')
             risk_score += min(len(matched_paths) * 8, 24)
@@ -115,8 +103,7 @@ def analyze_url(url):
             risk_score += 30
 
         # 9. URL shorteners
-        shorteners = ['bit.ly', 'tinyurl', 't.co', 'goo.gl', 'ow.ly', 'short.io', 'rb.gy', 'cutt.ly']
-        if any(s in domain for s in shorteners):
+        if any(s in domain for s in pack.shorteners):
             findings.append('URL shortener detected — hides the real destination')
             risk_score += 20
 
@@ -152,9 +139,14 @@ def analyze_url(url):
         }
 
 
-def inspect_urls_in_message(message):
-    """Extract and analyze all URLs found in a message."""
-    urls = extract_urls(message)
+def inspect_urls_in_message(message, url_spans=None, pack=None):
+    """
+    Extract and analyze all URLs found in a message.
+    Pass url_spans from extract_url_spans to skip re-scanning the text.
+    """
+    if url_spans is None:
+        url_spans = extract_url_spans(message)
+    urls = [url for _, _, url in url_spans]
     if not urls:
         return []
-    return [analyze_url(url) for url in urls[:5]]  # Limit to 5 URLs
+    return [analyze_url(url, pack) for url in urls[:5]]  # Limit to 5 URLs